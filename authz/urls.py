@@ -0,0 +1,13 @@
+# authz/urls.py
+
+from rest_framework.routers import DefaultRouter
+
+from .views import RolViewSet, UsuarioViewSet
+
+# Los ViewSets se registran aquí; backend/urls.py fusiona este registro en el
+# router principal para conservar la raíz /api/ y los sufijos de formato.
+router = DefaultRouter()
+router.register(r"roles", RolViewSet)
+router.register(r"usuarios", UsuarioViewSet)
+
+urlpatterns = []
@@ -71,7 +71,7 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
+        # APP_DIRS se reemplaza por app_directories.Loader dentro de "loaders"
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -79,6 +79,13 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # Templates compilados una vez por proceso (emails, admin)
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
@@ -131,6 +138,27 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Caché de reglas/configuraciones de reprogramación. Se invalida subiendo una
+# versión en la propia caché, así que solo llega a todos los workers si la caché
+# es compartida: en producción definir REDIS_URL. Sin ella cada proceso usa su
+# caché local y los demás workers pueden ver reglas viejas hasta
+# RESERVAS_CACHE_TIMEOUT segundos después de un cambio en el admin.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+RESERVAS_CACHE_TIMEOUT = int(os.getenv("RESERVAS_CACHE_TIMEOUT", 300 if REDIS_URL else 30))
+
 # Configuración de email para Gmail
 EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
@@ -142,6 +170,8 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER or "noreply@sistema-reservas.com"
 
 # Configuración específica para reprogramaciones
 ADMIN_EMAILS = os.getenv("ADMIN_EMAILS", "admin@tuagencia.com").split(",")
+# Tamaño de lote para bulk_create y el recorrido por bloques de los comandos de reservas
+RESERVAS_BULK_BATCH_SIZE = int(os.getenv("RESERVAS_BULK_BATCH_SIZE", 500))
 
 # Logging configuration
 LOGGING = {
@@ -2,33 +2,20 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from authz.views import RolViewSet, UsuarioViewSet
-from catalogo.views import CategoriaViewSet, ServicioViewSet, ItinerarioViewSet, PaqueteViewSet
-from reservas.views import (
-    ReservaViewSet, AcompananteViewSet, ReservaAcompananteViewSet, 
-    GestionReprogramacionAPIView, ReglasReprogramacionViewSet, ConfiguracionGlobalViewSet,
-    ValidadorReglasAPIView, ResumenReglasAPIView, GestionConfiguracionAPIView
-)
+from authz.urls import router as authz_router
+from catalogo.urls import router as catalogo_router
+from reservas.urls import router as reservas_router
 # from cupones.views import CuponViewSet  # Commented out until CuponViewSet is implemented
-from descuentos.views import DescuentoViewSet, ServicioDescuentoViewSet, precio_servicio
+from descuentos.urls import router as descuentos_router
 
+# Cada app declara sus ViewSets en su propio urls.py; aquí se fusionan en un
+# único router para mantener la raíz /api/ con todos los endpoints.
+# Es solo organización: Django carga el URLconf completo (y con él todas las
+# vistas) al resolver la primera petición, así que no cambia el tiempo de arranque.
 router = DefaultRouter()
-router.register(r"roles", RolViewSet)
-router.register(r"usuarios", UsuarioViewSet)
-router.register(r'categorias', CategoriaViewSet)
-router.register(r'servicios', ServicioViewSet)  
-router.register(r'itinerarios', ItinerarioViewSet)
-router.register(r'paquetes', PaqueteViewSet)
-router.register(r"reservas", ReservaViewSet)
-router.register(r"acompanantes", AcompananteViewSet)
-router.register(r"reserva-acompanantes", ReservaAcompananteViewSet)
+for app_router in (authz_router, catalogo_router, reservas_router, descuentos_router):
+    router.registry.extend(app_router.registry)
 # router.register(r"cupones", CuponViewSet)  # Commented out until CuponViewSet is implemented
-router.register(r'descuentos', DescuentoViewSet, basename='descuento')
-router.register(r'servicios-descuentos', ServicioDescuentoViewSet, basename='servicio-descuento')
-
-# Nuevos endpoints para reglas de reprogramación
-router.register(r'reglas-reprogramacion', ReglasReprogramacionViewSet, basename='reglas-reprogramacion')
-router.register(r'configuracion-global', ConfiguracionGlobalViewSet, basename='configuracion-global')
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -37,18 +24,11 @@ urlpatterns = [
     path("api/", include(router.urls)),
     path("api/auth/", include("authz.auth_urls")),  # lo creamos abajo
     path("api/autenticacion/", include("authz.auth_urls")),
-    path('api/servicios/<int:pk>/precio/', precio_servicio, name='precio-servicio'),
+    path("api/", include("descuentos.urls")),
     
     # URLs del sistema de soporte
     path('api/soporte/', include('soporte.urls')),
     
-    # URLs específicas para reprogramaciones
-    path('api/reservas/<int:reserva_id>/reprogramar-avanzado/', 
-         GestionReprogramacionAPIView.as_view(), 
-         name='reprogramar-reserva-avanzado'),
-    
-    # URLs para validación y configuración de reglas
-    path('api/reglas/validar/', ValidadorReglasAPIView.as_view(), name='validar-reglas'),
-    path('api/reglas/resumen/', ResumenReglasAPIView.as_view(), name='resumen-reglas'),
-    path('api/configuracion/sistema/', GestionConfiguracionAPIView.as_view(), name='gestion-configuracion'),
+    # URLs específicas de reservas, reprogramaciones y reglas
+    path("api/", include("reservas.urls")),
 ]
@@ -0,0 +1,15 @@
+# catalogo/urls.py
+
+from rest_framework.routers import DefaultRouter
+
+from .views import CategoriaViewSet, ServicioViewSet, ItinerarioViewSet, PaqueteViewSet
+
+# Los ViewSets se registran aquí; backend/urls.py fusiona este registro en el
+# router principal para conservar la raíz /api/ y los sufijos de formato.
+router = DefaultRouter()
+router.register(r'categorias', CategoriaViewSet)
+router.register(r'servicios', ServicioViewSet)
+router.register(r'itinerarios', ItinerarioViewSet)
+router.register(r'paquetes', PaqueteViewSet)
+
+urlpatterns = []
@@ -11,41 +11,41 @@ def execute_query(query: str) -> List[Tuple[Any, ...]]:
         cursor.execute(query)
         return cursor.fetchall()
 
-def check_table_exists(table_name: str) -> bool:
-    """Verifica si una tabla específica existe en la base de datos."""
-    result = execute_query(
-        "SELECT EXISTS (SELECT FROM information_schema.tables "
-        "WHERE table_schema='public' AND table_name=%s)"
-    )
-    return result[0][0] if result else False
+# Una sola consulta (un round-trip) para todos los listados; cada fila va
+# etiquetada con el grupo al que pertenece.
+filas = execute_query(
+    "SELECT 'historial', table_name FROM information_schema.tables "
+    "WHERE table_schema='public' AND table_name LIKE '%historial%' "
+    "UNION ALL "
+    "SELECT 'reservas', table_name FROM information_schema.tables "
+    "WHERE table_schema='public' AND table_name LIKE '%reservas%' "
+    "UNION ALL "
+    "SELECT 'migracion', name FROM django_migrations WHERE app='reservas' "
+    "ORDER BY 1, 2"
+)
+grupos = {'historial': [], 'reservas': [], 'migracion': []}
+for grupo, nombre in filas:
+    grupos[grupo].append(nombre)
 
 print("=== TABLAS DE HISTORIAL ===")
-historial_tables = execute_query(
-    "SELECT table_name FROM information_schema.tables "
-    "WHERE table_schema='public' AND table_name LIKE '%historial%'"
-)
+historial_tables = grupos['historial']
 if historial_tables:
     for table in historial_tables:
-        print(f"  - {table[0]}")
+        print(f"  - {table}")
 else:
     print("  ❌ No hay tablas de historial")
 
 print("\n=== TODAS LAS TABLAS DE RESERVAS ===")
-reservas_tables = execute_query(
-    "SELECT table_name FROM information_schema.tables "
-    "WHERE table_schema='public' AND table_name LIKE '%reservas%'"
-)
+reservas_tables = grupos['reservas']
 for table in reservas_tables:
-    print(f"  - {table[0]}")
+    print(f"  - {table}")
 
 print("\n=== VERIFICANDO TABLA ESPECÍFICA ===")
-existe = check_table_exists('reservas_historialreprogramacion')
+# El nombre contiene 'reservas', así que ya viene en el listado anterior
+existe = 'reservas_historialreprogramacion' in reservas_tables
 print(f"reservas_historialreprogramacion existe: {existe}")
 
 # Verificar el estado de las migraciones
 print("\n=== ESTADO DE MIGRACIONES ===")
-migraciones = execute_query(
-    "SELECT name FROM django_migrations WHERE app='reservas' ORDER BY name"
-)
-for mig in migraciones:
-    print(f"  ✅ {mig[0]}")
\ No newline at end of file
+for mig in grupos['migracion']:
+    print(f"  ✅ {mig}")
@@ -24,6 +24,16 @@ class Command(BaseCommand):
             'datos_reserva.json'
         ]
 
+        # Una sola invocación de loaddata carga todo en una transacción y
+        # resuelve referencias entre fixtures; si falla, se reintenta archivo
+        # por archivo para identificar cuál tiene problemas.
+        try:
+            call_command('loaddata', *fixtures)
+            self.stdout.write(self.style.SUCCESS(f'✔ Fixtures cargados: {len(fixtures)}'))
+            return
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'⚠ Error en carga conjunta, reintentando uno por uno: {e}'))
+
         for fixture in fixtures:
             try:
                 call_command('loaddata', fixture)
@@ -4,7 +4,12 @@ from typing import Any, Dict
 
 print('=== PROBANDO SERIALIZER DIRECTAMENTE ===')
 try:
-    reserva = Reserva.objects.get(id=1005)
+    # Cargar de una vez las relaciones que recorre ReservaConHistorialSerializer
+    reserva = Reserva.objects.select_related('usuario').prefetch_related(
+        'detalles__servicio',
+        'acompanantes__acompanante',
+        'historial_reprogramaciones__reprogramado_por',
+    ).get(id=1005)
     # Acceso seguro a atributos del modelo
     reserva_id = getattr(reserva, 'id', 'N/A')
     reserva_estado = getattr(reserva, 'estado', 'N/A')
@@ -0,0 +1,16 @@
+# descuentos/urls.py
+
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+
+from .views import DescuentoViewSet, ServicioDescuentoViewSet, precio_servicio
+
+# Los ViewSets se registran aquí; backend/urls.py fusiona este registro en el
+# router principal para conservar la raíz /api/ y los sufijos de formato.
+router = DefaultRouter()
+router.register(r'descuentos', DescuentoViewSet, basename='descuento')
+router.register(r'servicios-descuentos', ServicioDescuentoViewSet, basename='servicio-descuento')
+
+urlpatterns = [
+    path('servicios/<int:pk>/precio/', precio_servicio, name='precio-servicio'),
+]
@@ -11,14 +11,9 @@ for rol in roles:
     print(f'- {rol.nombre}')
 
 print('\n=== ASIGNANDO ROL ADMIN AL USUARIO DE PRUEBA ===')
-try:
-    rol_admin = Rol.objects.get(nombre='ADMIN')
-    user.roles.add(rol_admin)
-    print(f'✅ Rol ADMIN asignado a {user.email}')
-    print(f'Roles actuales: {list(user.roles.values_list("nombre", flat=True))}')
-except Rol.DoesNotExist:
-    print('❌ No existe el rol ADMIN')
-    print('Creando rol ADMIN...')
-    rol_admin = Rol.objects.create(nombre='ADMIN')
-    user.roles.add(rol_admin)
-    print(f'✅ Rol ADMIN creado y asignado a {user.email}')
\ No newline at end of file
+rol_admin, creado = Rol.objects.get_or_create(nombre='ADMIN')
+if creado:
+    print('Rol ADMIN no existía; creado.')
+user.roles.add(rol_admin)
+print(f'✅ Rol ADMIN asignado a {user.email}')
+print(f'Roles actuales: {list(user.roles.values_list("nombre", flat=True))}')
\ No newline at end of file
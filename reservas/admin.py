@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import IntegrityError, transaction
 from .models import Reserva, ReservaServicio, Acompanante, ReservaAcompanante, HistorialReprogramacion
 
 
@@ -7,16 +8,49 @@ class ReservaServicioInline(admin.TabularInline):
     extra = 0
     readonly_fields = ['precio_unitario']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('servicio')
+
 
 class ReservaAcompananteInline(admin.TabularInline):
     model = ReservaAcompanante
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('acompanante')
+
 
 class HistorialReprogramacionInline(admin.TabularInline):
     model = HistorialReprogramacion
     extra = 0
-    readonly_fields = ['created_at']
+    # reprogramado_por como solo lectura: se muestra desde el select_related
+    # en vez de cargar todos los usuarios en un <select> por cada fila
+    readonly_fields = ['reprogramado_por', 'created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('reprogramado_por')
+
+
+class ReprogramacionesBucketFilter(admin.SimpleListFilter):
+    """Agrupa numero_reprogramaciones en rangos fijos (sin SELECT DISTINCT)."""
+    title = 'número de reprogramaciones'
+    parameter_name = 'reprogramaciones'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('0', 'Sin reprogramar'),
+            ('low', '1-2'),
+            ('high', '3+'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == '0':
+            return queryset.filter(numero_reprogramaciones=0)
+        if self.value() == 'low':
+            return queryset.filter(numero_reprogramaciones__range=(1, 2))
+        if self.value() == 'high':
+            return queryset.filter(numero_reprogramaciones__gte=3)
+        return queryset
 
 
 @admin.register(Reserva)
@@ -25,11 +59,12 @@ class ReservaAdmin(admin.ModelAdmin):
         'id', 'usuario', 'fecha_inicio', 'estado', 'total', 'moneda', 
         'numero_reprogramaciones', 'created_at'
     ]
-    list_filter = ['estado', 'moneda', 'numero_reprogramaciones', 'created_at']
+    list_filter = ['estado', 'moneda', ReprogramacionesBucketFilter, 'created_at']
     search_fields = ['usuario__nombres', 'usuario__apellidos', 'usuario__email']
+    list_select_related = ['usuario']
     readonly_fields = [
         'fecha_original', 'fecha_reprogramacion', 'numero_reprogramaciones', 
-        'reprogramado_por', 'created_at', 'updated_at'
+        'reprogramado_por', 'recordatorio_enviado_para', 'created_at', 'updated_at'
     ]
     inlines = [ReservaServicioInline, ReservaAcompananteInline, HistorialReprogramacionInline]
     
@@ -40,7 +75,7 @@ class ReservaAdmin(admin.ModelAdmin):
         ('Reprogramaciones', {
             'fields': (
                 'fecha_original', 'fecha_reprogramacion', 'numero_reprogramaciones',
-                'motivo_reprogramacion', 'reprogramado_por'
+                'motivo_reprogramacion', 'reprogramado_por', 'recordatorio_enviado_para'
             ),
             'classes': ('collapse',)
         }),
@@ -63,6 +98,7 @@ class ReservaAcompananteAdmin(admin.ModelAdmin):
     list_display = ['reserva', 'acompanante', 'estado', 'es_titular']
     list_filter = ['estado', 'es_titular']
     search_fields = ['reserva__id', 'acompanante__nombre', 'acompanante__apellido']
+    list_select_related = ['reserva', 'acompanante']
 
 
 @admin.register(HistorialReprogramacion)
@@ -73,6 +109,7 @@ class HistorialReprogramacionAdmin(admin.ModelAdmin):
     ]
     list_filter = ['notificacion_enviada', 'created_at']
     search_fields = ['reserva__id', 'motivo', 'reprogramado_por__nombres']
+    list_select_related = ['reserva', 'reprogramado_por']
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
@@ -95,6 +132,12 @@ class HistorialReprogramacionAdmin(admin.ModelAdmin):
 
 from .models import ReglasReprogramacion, ConfiguracionGlobalReprogramacion
 
+
+def _es_changelist(request):
+    """True si la petición corresponde al listado (changelist) del admin."""
+    match = getattr(request, 'resolver_match', None)
+    return bool(match and match.url_name and match.url_name.endswith('_changelist'))
+
 @admin.register(ReglasReprogramacion)
 class ReglasReprogramacionAdmin(admin.ModelAdmin):
     list_display = [
@@ -133,6 +176,18 @@ class ReglasReprogramacionAdmin(admin.ModelAdmin):
     
     actions = ['activar_reglas', 'desactivar_reglas', 'duplicar_reglas']
     
+    def get_queryset(self, request):
+        """En el listado solo se traen las columnas que muestra list_display."""
+        qs = super().get_queryset(request)
+        if _es_changelist(request):
+            # valor_* para valor_display (obtener_valor() decide cuál se muestra)
+            qs = qs.only(
+                'pk', 'nombre', 'tipo_regla', 'aplicable_a',
+                'valor_numerico', 'valor_decimal', 'valor_texto', 'valor_booleano',
+                'activa', 'prioridad', 'created_at'
+            )
+        return qs
+    
     def valor_display(self, obj):
         """Muestra el valor interpretado de la regla."""
         valor = obj.obtener_valor()
@@ -145,6 +200,7 @@ class ReglasReprogramacionAdmin(admin.ModelAdmin):
     def activar_reglas(self, request, queryset):
         """Acción para activar reglas seleccionadas."""
         count = queryset.update(activa=True)
+        ReglasReprogramacion.invalidar_cache()  # update() no emite post_save
         self.message_user(request, f"{count} reglas activadas exitosamente.")
     
     activar_reglas.short_description = "Activar reglas seleccionadas"  # type: ignore
@@ -152,16 +208,16 @@ class ReglasReprogramacionAdmin(admin.ModelAdmin):
     def desactivar_reglas(self, request, queryset):
         """Acción para desactivar reglas seleccionadas."""
         count = queryset.update(activa=False)
+        ReglasReprogramacion.invalidar_cache()  # update() no emite post_save
         self.message_user(request, f"{count} reglas desactivadas exitosamente.")
     
     desactivar_reglas.short_description = "Desactivar reglas seleccionadas"  # type: ignore
     
     def duplicar_reglas(self, request, queryset):
         """Acción para duplicar reglas seleccionadas."""
-        count = 0
-        for regla in queryset:
-            # Crear una copia con nombre modificado
-            nueva_regla = ReglasReprogramacion(
+        # Crear copias con nombre modificado en un solo INSERT por lote
+        nuevas_reglas = [
+            ReglasReprogramacion(
                 nombre=f"Copia de {regla.nombre}",
                 tipo_regla=regla.tipo_regla,
                 aplicable_a=regla.aplicable_a,
@@ -176,9 +232,19 @@ class ReglasReprogramacionAdmin(admin.ModelAdmin):
                 mensaje_error=regla.mensaje_error,
                 condiciones_extras=regla.condiciones_extras
             )
-            nueva_regla.save()
-            count += 1
-        self.message_user(request, f"{count} reglas duplicadas exitosamente (creadas desactivadas).")
+            for regla in queryset.defer(None)  # se copian todas las columnas
+        ]
+        try:
+            with transaction.atomic():
+                ReglasReprogramacion.objects.bulk_create(nuevas_reglas, batch_size=500)
+        except IntegrityError:
+            self.message_user(
+                request,
+                "No se pudieron duplicar las reglas: ya existe una regla del mismo tipo para el mismo rol.",
+                level=messages.ERROR
+            )
+            return
+        self.message_user(request, f"{len(nuevas_reglas)} reglas duplicadas exitosamente (creadas desactivadas).")
     
     duplicar_reglas.short_description = "Duplicar reglas seleccionadas"  # type: ignore
 
@@ -209,6 +275,13 @@ class ConfiguracionGlobalAdmin(admin.ModelAdmin):
     
     actions = ['activar_configs', 'desactivar_configs']
     
+    def get_queryset(self, request):
+        """En el listado se omite la descripción (texto largo no mostrado)."""
+        qs = super().get_queryset(request)
+        if _es_changelist(request):
+            qs = qs.only('pk', 'clave', 'valor', 'tipo_valor', 'activa', 'updated_at')
+        return qs
+    
     def valor_display(self, obj):
         """Muestra el valor de forma legible."""
         valor = str(obj.valor)
@@ -219,6 +292,7 @@ class ConfiguracionGlobalAdmin(admin.ModelAdmin):
     def activar_configs(self, request, queryset):
         """Activar configuraciones seleccionadas."""
         count = queryset.update(activa=True)
+        ConfiguracionGlobalReprogramacion.invalidar_cache()  # update() no emite post_save
         self.message_user(request, f"{count} configuraciones activadas.")
     
     activar_configs.short_description = "Activar configuraciones"  # type: ignore
@@ -226,6 +300,7 @@ class ConfiguracionGlobalAdmin(admin.ModelAdmin):
     def desactivar_configs(self, request, queryset):
         """Desactivar configuraciones seleccionadas."""
         count = queryset.update(activa=False)
+        ConfiguracionGlobalReprogramacion.invalidar_cache()  # update() no emite post_save
         self.message_user(request, f"{count} configuraciones desactivadas.")
     
     desactivar_configs.short_description = "Desactivar configuraciones"  # type: ignore
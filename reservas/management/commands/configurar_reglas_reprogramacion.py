@@ -3,11 +3,177 @@ Comando de gestión para configurar reglas de reprogramación iniciales.
 Este comando crea un conjunto básico de reglas que pueden ser personalizadas después.
 """
 
+import csv
+import io
+import json
+
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
 from reservas.models import ReglasReprogramacion, ConfiguracionGlobalReprogramacion
 
 
+# Tablas de reglas por perfil: constantes de módulo, se construyen una sola vez
+REGLAS_BASICAS = (
+    # Tiempo mínimo estándar para todos
+    {
+        'nombre': 'Tiempo mínimo estándar',
+        'tipo_regla': 'TIEMPO_MINIMO',
+        'aplicable_a': 'ALL',
+        'valor_numerico': 24,
+        'prioridad': 1,
+        'mensaje_error': 'Debe reprogramar con al menos 24 horas de anticipación.',
+        'activa': True
+    },
+    # Límite de reprogramaciones para clientes
+    {
+        'nombre': 'Límite reprogramaciones clientes',
+        'tipo_regla': 'LIMITE_REPROGRAMACIONES',
+        'aplicable_a': 'CLIENTE',
+        'valor_numerico': 3,
+        'prioridad': 1,
+        'mensaje_error': 'Ha alcanzado el límite máximo de 3 reprogramaciones por reserva.',
+        'activa': True
+    },
+    # Restricción días domingo
+    {
+        'nombre': 'Sin reprogramaciones domingos',
+        'tipo_regla': 'DIAS_BLACKOUT',
+        'aplicable_a': 'ALL',
+        'valor_texto': '["domingo"]',
+        'prioridad': 2,
+        'mensaje_error': 'No se permite reprogramar para días domingo.',
+        'activa': True
+    }
+)
+
+REGLAS_ESTRICTAS = REGLAS_BASICAS + (
+    # Tiempo mínimo más estricto para clientes
+    {
+        'nombre': 'Tiempo mínimo clientes estricto',
+        'tipo_regla': 'TIEMPO_MINIMO',
+        'aplicable_a': 'CLIENTE',
+        'valor_numerico': 48,
+        'prioridad': 1,
+        'mensaje_error': 'Los clientes deben reprogramar con al menos 48 horas de anticipación.',
+        'activa': True
+    },
+    # Límite diario de reprogramaciones
+    {
+        'nombre': 'Límite diario reprogramaciones',
+        'tipo_regla': 'LIMITE_DIARIO',
+        'aplicable_a': 'CLIENTE',
+        'valor_numerico': 2,
+        'prioridad': 1,
+        'mensaje_error': 'No puede hacer más de 2 reprogramaciones por día.',
+        'activa': True
+    },
+    # Penalización por reprogramar
+    {
+        'nombre': 'Penalización reprogramación',
+        'tipo_regla': 'DESCUENTO_PENALIZACION',
+        'aplicable_a': 'CLIENTE',
+        'valor_decimal': 5.0,
+        'prioridad': 1,
+        'mensaje_error': 'Se aplicará una penalización del 5% por reprogramar.',
+        'activa': True
+    },
+    # Horas blackout nocturnas
+    {
+        'nombre': 'Sin reprogramaciones nocturnas',
+        'tipo_regla': 'HORAS_BLACKOUT',
+        'aplicable_a': 'ALL',
+        'valor_texto': '[22, 23, 0, 1, 2, 3, 4, 5]',
+        'prioridad': 2,
+        'mensaje_error': 'No se permite reprogramar entre las 22:00 y 06:00 horas.',
+        'activa': True
+    }
+)
+
+REGLAS_FLEXIBLES = (
+    # Tiempo mínimo reducido para todos
+    {
+        'nombre': 'Tiempo mínimo flexible',
+        'tipo_regla': 'TIEMPO_MINIMO',
+        'aplicable_a': 'ALL',
+        'valor_numerico': 12,
+        'prioridad': 1,
+        'mensaje_error': 'Debe reprogramar con al menos 12 horas de anticipación.',
+        'activa': True
+    },
+    # Sin límite para administradores
+    {
+        'nombre': 'Sin límite admins',
+        'tipo_regla': 'LIMITE_REPROGRAMACIONES',
+        'aplicable_a': 'ADMIN',
+        'valor_numerico': 999,
+        'prioridad': 1,
+        'mensaje_error': 'Los administradores no tienen límite de reprogramaciones.',
+        'activa': True
+    },
+    # Límite alto para clientes
+    {
+        'nombre': 'Límite alto clientes',
+        'tipo_regla': 'LIMITE_REPROGRAMACIONES',
+        'aplicable_a': 'CLIENTE',
+        'valor_numerico': 5,
+        'prioridad': 2,
+        'mensaje_error': 'Ha alcanzado el límite de 5 reprogramaciones por reserva.',
+        'activa': True
+    },
+    # Tiempo mínimo muy reducido para admins
+    {
+        'nombre': 'Tiempo mínimo admins',
+        'tipo_regla': 'TIEMPO_MINIMO',
+        'aplicable_a': 'ADMIN',
+        'valor_numerico': 2,
+        'prioridad': 1,
+        'mensaje_error': 'Los administradores pueden reprogramar con 2 horas de anticipación.',
+        'activa': True
+    }
+)
+
+PERFIL_REGLAS = {
+    'basico': REGLAS_BASICAS,
+    'estricto': REGLAS_ESTRICTAS,
+    'flexible': REGLAS_FLEXIBLES,
+}
+
+CONFIGURACIONES_GLOBALES = (
+    {
+        'clave': 'EMAIL_NOTIFICACIONES',
+        'valor': 'true',
+        'descripcion': 'Habilitar envío de notificaciones por email',
+        'tipo_valor': 'BOOLEAN'
+    },
+    {
+        'clave': 'ADMIN_EMAILS',
+        'valor': 'admin@tuagencia.com',
+        'descripcion': 'Emails de administradores para notificaciones',
+        'tipo_valor': 'LISTA'
+    },
+    {
+        'clave': 'RECORDATORIOS_ACTIVOS',
+        'valor': 'true',
+        'descripcion': 'Activar recordatorios automáticos de reprogramaciones',
+        'tipo_valor': 'BOOLEAN'
+    },
+    {
+        'clave': 'DIAS_RECORDATORIO',
+        'valor': '1',
+        'descripcion': 'Días antes de la reserva para enviar recordatorio',
+        'tipo_valor': 'INTEGER'
+    },
+    {
+        'clave': 'LOG_REPROGRAMACIONES',
+        'valor': 'true',
+        'descripcion': 'Registrar logs detallados de reprogramaciones',
+        'tipo_valor': 'BOOLEAN'
+    }
+)
+
+
 class Command(BaseCommand):
     help = 'Configura reglas de reprogramación iniciales para el sistema'
     
@@ -29,11 +195,19 @@ class Command(BaseCommand):
             default='basico',
             help='Perfil de reglas a aplicar (basico, estricto, flexible)',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Filas por INSERT en bulk_create (default: settings.RESERVAS_BULK_BATCH_SIZE)',
+        )
     
     def handle(self, *args, **options):
         perfil = options['perfil']
         dry_run = options['dry_run']
         reset = options['reset']
+        self.batch_size = options['batch_size'] or settings.RESERVAS_BULK_BATCH_SIZE
+        self.reset = reset
         
         if dry_run:
             self.stdout.write(
@@ -55,6 +229,10 @@ class Command(BaseCommand):
                     # Hacer rollback en dry-run
                     transaction.set_rollback(True)
                 else:
+                    # bulk_create/COPY/TRUNCATE no emiten señales: invalidar la
+                    # caché de reglas y configuraciones al confirmar
+                    transaction.on_commit(ReglasReprogramacion.invalidar_cache)
+                    transaction.on_commit(ConfiguracionGlobalReprogramacion.invalidar_cache)
                     self.stdout.write(
                         self.style.SUCCESS(f'Reglas del perfil "{perfil}" configuradas exitosamente')
                     )
@@ -74,8 +252,18 @@ class Command(BaseCommand):
             count_reglas = ReglasReprogramacion.objects.count()
             count_configs = ConfiguracionGlobalReprogramacion.objects.count()
             
-            ReglasReprogramacion.objects.all().delete()
-            ConfiguracionGlobalReprogramacion.objects.all().delete()
+            if connection.vendor == 'postgresql':
+                # TRUNCATE vacía las tablas sin recorrer fila por fila (ni señales)
+                # y reinicia las secuencias; sigue dentro del transaction.atomic()
+                tablas = ', '.join(
+                    connection.ops.quote_name(modelo._meta.db_table)
+                    for modelo in (ReglasReprogramacion, ConfiguracionGlobalReprogramacion)
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'TRUNCATE TABLE {tablas} RESTART IDENTITY')
+            else:
+                ReglasReprogramacion.objects.all().delete()
+                ConfiguracionGlobalReprogramacion.objects.all().delete()
             
             self.stdout.write(
                 f'Eliminadas {count_reglas} reglas y {count_configs} configuraciones existentes'
@@ -89,197 +277,97 @@ class Command(BaseCommand):
             self.stdout.write(f'\\nReglas del perfil "{perfil}" que se crearían:')
             for regla in reglas_data:
                 self.stdout.write(f'  - {regla["nombre"]}: {regla["tipo_regla"]} ({regla["aplicable_a"]})')
+        elif self.reset and connection.vendor == 'postgresql':
+            # Tabla recién vaciada en esta misma transacción: no hay conflictos
+            # posibles, así que se carga directo con COPY
+            self._copy_reglas(reglas_data)
+            for regla_data in reglas_data:
+                self.stdout.write(f'✓ Creada: {regla_data["nombre"]}')
         else:
+            # Una sola consulta para saber qué (tipo_regla, aplicable_a) ya existen;
+            # la resuelve el índice único compuesto de unique_together (0002)
+            existentes = {
+                (tipo, aplicable): nombre
+                for tipo, aplicable, nombre in ReglasReprogramacion.objects.filter(
+                    tipo_regla__in={r['tipo_regla'] for r in reglas_data},
+                    aplicable_a__in={r['aplicable_a'] for r in reglas_data}
+                ).values_list('tipo_regla', 'aplicable_a', 'nombre')
+            }
+            
+            nuevas = []
             for regla_data in reglas_data:
-                regla, created = ReglasReprogramacion.objects.get_or_create(
-                    tipo_regla=regla_data['tipo_regla'],
-                    aplicable_a=regla_data['aplicable_a'],
-                    defaults=regla_data
-                )
-                
-                if created:
-                    self.stdout.write(f'✓ Creada: {regla.nombre}')
+                clave = (regla_data['tipo_regla'], regla_data['aplicable_a'])
+                if clave in existentes:
+                    self.stdout.write(f'⚠ Ya existe: {existentes[clave]}')
                 else:
-                    self.stdout.write(f'⚠ Ya existe: {regla.nombre}')
+                    nuevas.append(ReglasReprogramacion(**regla_data))
+                    self.stdout.write(f'✓ Creada: {regla_data["nombre"]}')
+            
+            ReglasReprogramacion.objects.bulk_create(nuevas, batch_size=self.batch_size, ignore_conflicts=True)
+    
+    def _copy_reglas(self, reglas_data):
+        """Inserta las reglas con COPY FROM STDIN (solo PostgreSQL).
+        
+        Evita el costo del ORM por fila (instanciar modelos, armar parámetros).
+        Como COPY no aplica los defaults de Django, aquí se completan
+        activa, prioridad, condiciones_extras y las marcas de tiempo.
+        """
+        columnas = (
+            'nombre', 'tipo_regla', 'aplicable_a', 'valor_numerico', 'valor_decimal',
+            'valor_texto', 'valor_booleano', 'activa', 'prioridad', 'mensaje_error',
+            'condiciones_extras', 'created_at', 'updated_at',
+        )
+        ahora = timezone.now().isoformat()
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for regla in reglas_data:
+            valores = {'activa': True, 'prioridad': 1, 'condiciones_extras': {}, **regla}
+            valores['condiciones_extras'] = json.dumps(valores['condiciones_extras'])
+            valores['created_at'] = valores['updated_at'] = ahora
+            # En formato CSV un campo vacío sin comillas es NULL
+            writer.writerow([valores.get(columna) for columna in columnas])
+        buffer.seek(0)
+        
+        tabla = connection.ops.quote_name(ReglasReprogramacion._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
     
     def _crear_configuraciones_globales(self, dry_run):
         """Crea configuraciones globales básicas."""
-        configs_data = [
-            {
-                'clave': 'EMAIL_NOTIFICACIONES',
-                'valor': 'true',
-                'descripcion': 'Habilitar envío de notificaciones por email',
-                'tipo_valor': 'BOOLEAN'
-            },
-            {
-                'clave': 'ADMIN_EMAILS',
-                'valor': 'admin@tuagencia.com',
-                'descripcion': 'Emails de administradores para notificaciones',
-                'tipo_valor': 'LISTA'
-            },
-            {
-                'clave': 'RECORDATORIOS_ACTIVOS',
-                'valor': 'true',
-                'descripcion': 'Activar recordatorios automáticos de reprogramaciones',
-                'tipo_valor': 'BOOLEAN'
-            },
-            {
-                'clave': 'DIAS_RECORDATORIO',
-                'valor': '1',
-                'descripcion': 'Días antes de la reserva para enviar recordatorio',
-                'tipo_valor': 'INTEGER'
-            },
-            {
-                'clave': 'LOG_REPROGRAMACIONES',
-                'valor': 'true',
-                'descripcion': 'Registrar logs detallados de reprogramaciones',
-                'tipo_valor': 'BOOLEAN'
-            }
-        ]
+        configs_data = CONFIGURACIONES_GLOBALES
         
         if dry_run:
             self.stdout.write('\\nConfiguraciones globales que se crearían:')
             for config in configs_data:
                 self.stdout.write(f'  - {config["clave"]}: {config["valor"]}')
         else:
+            existentes = set(
+                ConfiguracionGlobalReprogramacion.objects.filter(
+                    clave__in=[c['clave'] for c in configs_data]
+                ).values_list('clave', flat=True)
+            )
+            
             for config_data in configs_data:
-                config, created = ConfiguracionGlobalReprogramacion.objects.get_or_create(
-                    clave=config_data['clave'],
-                    defaults=config_data
-                )
-                
-                if created:
-                    self.stdout.write(f'✓ Configuración creada: {config.clave}')
+                if config_data['clave'] in existentes:
+                    self.stdout.write(f'⚠ Configuración ya existe: {config_data["clave"]}')
                 else:
-                    self.stdout.write(f'⚠ Configuración ya existe: {config.clave}')
+                    self.stdout.write(f'✓ Configuración creada: {config_data["clave"]}')
+            
+            # UPSERT en una sola sentencia (INSERT ... ON CONFLICT (clave) DO UPDATE).
+            # En las existentes solo se refrescan descripción y tipo: el valor
+            # puede haber sido ajustado desde el admin y no se pisa.
+            ConfiguracionGlobalReprogramacion.objects.bulk_create(
+                [ConfiguracionGlobalReprogramacion(**config_data) for config_data in configs_data],
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['clave'],
+                update_fields=['descripcion', 'tipo_valor']
+            )
     
     def _obtener_reglas_perfil(self, perfil):
         """Obtiene las reglas según el perfil seleccionado."""
-        
-        reglas_basicas = [
-            # Tiempo mínimo estándar para todos
-            {
-                'nombre': 'Tiempo mínimo estándar',
-                'tipo_regla': 'TIEMPO_MINIMO',
-                'aplicable_a': 'ALL',
-                'valor_numerico': 24,
-                'prioridad': 1,
-                'mensaje_error': 'Debe reprogramar con al menos 24 horas de anticipación.',
-                'activa': True
-            },
-            # Límite de reprogramaciones para clientes
-            {
-                'nombre': 'Límite reprogramaciones clientes',
-                'tipo_regla': 'LIMITE_REPROGRAMACIONES',
-                'aplicable_a': 'CLIENTE',
-                'valor_numerico': 3,
-                'prioridad': 1,
-                'mensaje_error': 'Ha alcanzado el límite máximo de 3 reprogramaciones por reserva.',
-                'activa': True
-            },
-            # Restricción días domingo
-            {
-                'nombre': 'Sin reprogramaciones domingos',
-                'tipo_regla': 'DIAS_BLACKOUT',
-                'aplicable_a': 'ALL',
-                'valor_texto': '["domingo"]',
-                'prioridad': 2,
-                'mensaje_error': 'No se permite reprogramar para días domingo.',
-                'activa': True
-            }
-        ]
-        
-        if perfil == 'basico':
-            return reglas_basicas
-        
-        elif perfil == 'estricto':
-            reglas_estrictas = reglas_basicas + [
-                # Tiempo mínimo más estricto para clientes
-                {
-                    'nombre': 'Tiempo mínimo clientes estricto',
-                    'tipo_regla': 'TIEMPO_MINIMO',
-                    'aplicable_a': 'CLIENTE',
-                    'valor_numerico': 48,
-                    'prioridad': 1,
-                    'mensaje_error': 'Los clientes deben reprogramar con al menos 48 horas de anticipación.',
-                    'activa': True
-                },
-                # Límite diario de reprogramaciones
-                {
-                    'nombre': 'Límite diario reprogramaciones',
-                    'tipo_regla': 'LIMITE_DIARIO',
-                    'aplicable_a': 'CLIENTE',
-                    'valor_numerico': 2,
-                    'prioridad': 1,
-                    'mensaje_error': 'No puede hacer más de 2 reprogramaciones por día.',
-                    'activa': True
-                },
-                # Penalización por reprogramar
-                {
-                    'nombre': 'Penalización reprogramación',
-                    'tipo_regla': 'DESCUENTO_PENALIZACION',
-                    'aplicable_a': 'CLIENTE',
-                    'valor_decimal': 5.0,
-                    'prioridad': 1,
-                    'mensaje_error': 'Se aplicará una penalización del 5% por reprogramar.',
-                    'activa': True
-                },
-                # Horas blackout nocturnas
-                {
-                    'nombre': 'Sin reprogramaciones nocturnas',
-                    'tipo_regla': 'HORAS_BLACKOUT',
-                    'aplicable_a': 'ALL',
-                    'valor_texto': '[22, 23, 0, 1, 2, 3, 4, 5]',
-                    'prioridad': 2,
-                    'mensaje_error': 'No se permite reprogramar entre las 22:00 y 06:00 horas.',
-                    'activa': True
-                }
-            ]
-            return reglas_estrictas
-        
-        elif perfil == 'flexible':
-            reglas_flexibles = [
-                # Tiempo mínimo reducido para todos
-                {
-                    'nombre': 'Tiempo mínimo flexible',
-                    'tipo_regla': 'TIEMPO_MINIMO',
-                    'aplicable_a': 'ALL',
-                    'valor_numerico': 12,
-                    'prioridad': 1,
-                    'mensaje_error': 'Debe reprogramar con al menos 12 horas de anticipación.',
-                    'activa': True
-                },
-                # Sin límite para administradores
-                {
-                    'nombre': 'Sin límite admins',
-                    'tipo_regla': 'LIMITE_REPROGRAMACIONES',
-                    'aplicable_a': 'ADMIN',
-                    'valor_numerico': 999,
-                    'prioridad': 1,
-                    'mensaje_error': 'Los administradores no tienen límite de reprogramaciones.',
-                    'activa': True
-                },
-                # Límite alto para clientes
-                {
-                    'nombre': 'Límite alto clientes',
-                    'tipo_regla': 'LIMITE_REPROGRAMACIONES',
-                    'aplicable_a': 'CLIENTE',
-                    'valor_numerico': 5,
-                    'prioridad': 2,
-                    'mensaje_error': 'Ha alcanzado el límite de 5 reprogramaciones por reserva.',
-                    'activa': True
-                },
-                # Tiempo mínimo muy reducido para admins
-                {
-                    'nombre': 'Tiempo mínimo admins',
-                    'tipo_regla': 'TIEMPO_MINIMO',
-                    'aplicable_a': 'ADMIN',
-                    'valor_numerico': 2,
-                    'prioridad': 1,
-                    'mensaje_error': 'Los administradores pueden reprogramar con 2 horas de anticipación.',
-                    'activa': True
-                }
-            ]
-            return reglas_flexibles
-        
-        return reglas_basicas
\ No newline at end of file
+        return PERFIL_REGLAS.get(perfil, REGLAS_BASICAS)
@@ -1,6 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db.models import F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from itertools import islice
 from reservas.models import Reserva
 from reservas.notifications import NotificacionReprogramacion
 import logging
@@ -23,24 +27,59 @@ class Command(BaseCommand):
             action='store_true',
             help='Solo mostrar qué recordatorios se enviarían sin enviarlos realmente'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Hilos para enviar emails en paralelo, cada uno con su conexión SMTP (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Reservas leídas y procesadas por bloque (default: settings.RESERVAS_BULK_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Máximo de recordatorios a procesar en esta ejecución'
+        )
 
     def handle(self, *args, **options):
         dias_antes = options['dias_antes']
         dry_run = options['dry_run']
+        workers = max(1, options['workers'])
+        batch_size = options['batch_size'] or settings.RESERVAS_BULK_BATCH_SIZE
+        limit = options['limit']
         
         # Calcular la fecha objetivo para los recordatorios
         fecha_objetivo = timezone.now().date() + timedelta(days=dias_antes)
+        # Rango [inicio, fin) del día en la zona horaria actual: compara la
+        # columna directamente (usa el índice) en vez de aplicar DATE() a cada fila
+        inicio_dia = timezone.make_aware(datetime.combine(fecha_objetivo, time.min))
+        fin_dia = timezone.make_aware(datetime.combine(fecha_objetivo + timedelta(days=1), time.min))
         
         # Buscar reservas reprogramadas que necesiten recordatorio
         reservas_para_recordatorio = Reserva.objects.filter(
-            fecha_inicio__date=fecha_objetivo,
+            fecha_inicio__gte=inicio_dia,
+            fecha_inicio__lt=fin_dia,
             estado='REPROGRAMADA',
             numero_reprogramaciones__gte=1
-        ).select_related('usuario')
-        
-        total_reservas = reservas_para_recordatorio.count()
+        ).exclude(
+            # Ya recordadas para esta misma fecha (p. ej. en una ejecución anterior
+            # que se interrumpió); si se reprograma de nuevo vuelven a entrar
+            recordatorio_enviado_para=F('fecha_inicio')
+        ).select_related('usuario').only(
+            # Solo las columnas que usan el comando y enviar_recordatorio_reprogramacion
+            'pk', 'fecha_inicio', 'total', 'moneda',
+            'usuario', 'usuario__nombres', 'usuario__email'
+        ).order_by('pk')
+        if limit:
+            reservas_para_recordatorio = reservas_para_recordatorio[:limit]
         
-        if total_reservas == 0:
+        # Salida temprana con un SELECT ... LIMIT 1 cuando no hay nada que enviar
+        if not reservas_para_recordatorio.exists():
             self.stdout.write(
                 self.style.SUCCESS(
                     f'No hay reservas reprogramadas para recordatorio en {dias_antes} días.'
@@ -48,51 +87,72 @@ class Command(BaseCommand):
             )
             return
         
-        self.stdout.write(
-            self.style.WARNING(
-                f'Encontradas {total_reservas} reservas reprogramadas para recordatorio.'
-            )
-        )
-        
         exitosos = 0
         fallidos = 0
+        # Las líneas por reserva se acumulan y se escriben una vez por bloque
+        lineas = []
         
-        for reserva in reservas_para_recordatorio:
-            try:
+        # Recorrer por bloques con cursor en servidor: memoria acotada al chunk
+        iterador = reservas_para_recordatorio.iterator(chunk_size=batch_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for bloque in iter(lambda: list(islice(iterador, batch_size)), []):
                 if dry_run:
-                    self.stdout.write(
-                        f'[DRY RUN] Recordatorio para reserva #{reserva.pk} - {reserva.usuario.email}'
-                    )
-                    exitosos += 1
-                else:
-                    # Enviar recordatorio
-                    resultado = NotificacionReprogramacion.enviar_recordatorio_reprogramacion(
-                        reserva, dias_antes
-                    )
-                    
-                    if resultado:
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'✓ Recordatorio enviado para reserva #{reserva.pk} - {reserva.usuario.email}'
-                            )
+                    for reserva in bloque:
+                        lineas.append(
+                            f'[DRY RUN] Recordatorio para reserva #{reserva.pk} - {reserva.usuario.email}'
                         )
                         exitosos += 1
-                    else:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f'✗ Error enviando recordatorio para reserva #{reserva.pk} - {reserva.usuario.email}'
-                            )
-                        )
-                        fallidos += 1
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'✗ Error procesando reserva #{reserva.pk}: {str(e)}'
+                else:
+                    # Repartir el bloque en porciones contiguas, una por hilo; cada
+                    # porción se envía con su propia conexión SMTP (no se comparten
+                    # entre hilos)
+                    tamano = -(-len(bloque) // workers)
+                    porciones = [bloque[i:i + tamano] for i in range(0, len(bloque), tamano)]
+                    
+                    enviadas = []
+                    for resultados in executor.map(NotificacionReprogramacion.enviar_recordatorios_lote, porciones, [dias_antes] * len(porciones)):
+                        for reserva, resultado, error in resultados:
+                            if error is not None:
+                                lineas.append(
+                                    self.style.ERROR(
+                                        f'✗ Error procesando reserva #{reserva.pk}: {str(error)}'
+                                    )
+                                )
+                                fallidos += 1
+                                logger.error('Error en recordatorio para reserva %s: %s', reserva.pk, error)
+                            elif resultado:
+                                lineas.append(
+                                    self.style.SUCCESS(
+                                        f'✓ Recordatorio enviado para reserva #{reserva.pk} - {reserva.usuario.email}'
+                                    )
+                                )
+                                exitosos += 1
+                                enviadas.append(reserva.pk)
+                            else:
+                                lineas.append(
+                                    self.style.ERROR(
+                                        f'✗ Error enviando recordatorio para reserva #{reserva.pk} - {reserva.usuario.email}'
+                                    )
+                                )
+                                fallidos += 1
+                    
+                    # Marcar el bloque como recordado con un solo UPDATE, así
+                    # una nueva ejecución no vuelve a enviar estos emails
+                    Reserva.objects.filter(pk__in=enviadas).update(
+                        recordatorio_enviado_para=F('fecha_inicio')
                     )
-                )
-                fallidos += 1
-                logger.error(f'Error en recordatorio para reserva {reserva.pk}: {str(e)}')
+                
+                self.stdout.write('\n'.join(lineas))
+                lineas.clear()
+        
+        # El total sale del mismo recorrido: no hace falta un COUNT(*) previo
+        total_reservas = exitosos + fallidos
+        
+        self.stdout.write(
+            self.style.WARNING(
+                f'\nProcesadas {total_reservas} reservas reprogramadas para recordatorio.'
+            )
+        )
         
         # Resumen final
         if dry_run:
@@ -114,4 +174,4 @@ class Command(BaseCommand):
                     )
                 )
             
-            logger.info(f'Comando recordatorios completado: {exitosos} exitosos, {fallidos} fallidos')
\ No newline at end of file
+            logger.info('Comando recordatorios completado: %s exitosos, %s fallidos', exitosos, fallidos)
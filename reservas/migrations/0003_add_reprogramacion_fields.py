@@ -38,21 +38,19 @@ class Migration(migrations.Migration):
                                   related_name="reservas_reprogramadas", to=settings.AUTH_USER_MODEL,
                                   help_text="Usuario que hizo la reprogramación"),
         ),
-        # Agregar los índices que faltan
+        # Agregar los índices que faltan (una sola operación RunSQL)
         migrations.RunSQL(
-            "CREATE INDEX IF NOT EXISTS reservas_reserva_usuario_idx ON reservas_reserva(usuario_id);",
-            reverse_sql="DROP INDEX IF EXISTS reservas_reserva_usuario_idx;"
-        ),
-        migrations.RunSQL(
-            "CREATE INDEX IF NOT EXISTS reservas_reserva_estado_idx ON reservas_reserva(estado);",
-            reverse_sql="DROP INDEX IF EXISTS reservas_reserva_estado_idx;"
-        ),
-        migrations.RunSQL(
-            "CREATE INDEX IF NOT EXISTS reservas_reserva_fecha_inicio_idx ON reservas_reserva(fecha_inicio);",
-            reverse_sql="DROP INDEX IF EXISTS reservas_reserva_fecha_inicio_idx;"
-        ),
-        migrations.RunSQL(
-            "CREATE INDEX IF NOT EXISTS reservas_reserva_fecha_reprogramacion_idx ON reservas_reserva(fecha_reprogramacion);",
-            reverse_sql="DROP INDEX IF EXISTS reservas_reserva_fecha_reprogramacion_idx;"
+            sql=[
+                "CREATE INDEX IF NOT EXISTS reservas_reserva_usuario_idx ON reservas_reserva(usuario_id);",
+                "CREATE INDEX IF NOT EXISTS reservas_reserva_estado_idx ON reservas_reserva(estado);",
+                "CREATE INDEX IF NOT EXISTS reservas_reserva_fecha_inicio_idx ON reservas_reserva(fecha_inicio);",
+                "CREATE INDEX IF NOT EXISTS reservas_reserva_fecha_reprogramacion_idx ON reservas_reserva(fecha_reprogramacion);",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS reservas_reserva_usuario_idx;",
+                "DROP INDEX IF EXISTS reservas_reserva_estado_idx;",
+                "DROP INDEX IF EXISTS reservas_reserva_fecha_inicio_idx;",
+                "DROP INDEX IF EXISTS reservas_reserva_fecha_reprogramacion_idx;",
+            ]
         ),
     ]
\ No newline at end of file
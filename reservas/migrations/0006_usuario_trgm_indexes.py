@@ -0,0 +1,38 @@
+# Generated manually: índices trigram para la búsqueda del admin de reservas
+# (ReservaAdmin.search_fields usa icontains sobre usuario__nombres/apellidos/email).
+# En PostgreSQL icontains genera UPPER("col"::text) LIKE UPPER(%s), no ILIKE:
+# los índices son de expresión sobre UPPER(col::text) para que el planner los use.
+
+from django.db import migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    # CONCURRENTLY no puede ejecutarse dentro de una transacción; así la
+    # creación no bloquea escrituras en authz_usuario (logins, registros)
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0005_historialreprogramacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+            reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS authz_usuario_nombres_upper_trgm ON authz_usuario USING gin (UPPER(nombres::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS authz_usuario_nombres_upper_trgm;"
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS authz_usuario_apellidos_upper_trgm ON authz_usuario USING gin (UPPER(apellidos::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS authz_usuario_apellidos_upper_trgm;"
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS authz_usuario_email_upper_trgm ON authz_usuario USING gin (UPPER(email::text) gin_trgm_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS authz_usuario_email_upper_trgm;"
+        ),
+    ]
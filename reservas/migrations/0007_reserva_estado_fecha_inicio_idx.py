@@ -0,0 +1,22 @@
+# Generated manually: índice compuesto (estado, fecha_inicio) para
+# enviar_recordatorios, que filtra exactamente por ese par.
+# CONCURRENTLY no puede ir dentro de una transacción, por eso atomic = False.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0006_usuario_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS reservas_reserva_estado_fecha_inicio_idx "
+            "ON reservas_reserva(estado, fecha_inicio);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS reservas_reserva_estado_fecha_inicio_idx;"
+        ),
+    ]
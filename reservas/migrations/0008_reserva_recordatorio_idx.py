@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:46
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # AddIndexConcurrently no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0007_reserva_estado_fecha_inicio_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado', 'REPROGRAMADA')), fields=['fecha_inicio', 'numero_reprogramaciones'], name='reservas_recordatorio_idx'),
+        ),
+    ]
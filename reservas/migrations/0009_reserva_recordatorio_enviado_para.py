@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0008_reserva_recordatorio_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='recordatorio_enviado_para',
+            field=models.DateTimeField(blank=True, help_text='Fecha de inicio para la que ya se envió el recordatorio', null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:54
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Las operaciones CONCURRENTLY no pueden ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0009_reserva_recordatorio_enviado_para'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='reglasreprogramacion',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['tipo_regla', 'prioridad'], name='regla_tipo_prio_idx'),
+        ),
+        # Crear el compuesto antes de borrar el de usuario: nunca queda sin índice
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(fields=['usuario', 'estado', '-fecha_inicio'], name='reserva_usr_estado_fecha_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='reserva',
+            name='reservas_re_usuario_cdc4d6_idx',
+        ),
+        # Mismo índice creado a mano en 0003; el compuesto empieza por usuario
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS reservas_reserva_usuario_idx;",
+            reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS reservas_reserva_usuario_idx "
+                        "ON reservas_reserva(usuario_id);"
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0010_reserva_regla_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='reglasreprogramacion',
+            constraint=models.CheckConstraint(condition=models.Q(('valor_numerico__isnull', False), ('valor_decimal__isnull', False), models.Q(('valor_texto__isnull', False), models.Q(('valor_texto', ''), _negated=True)), ('valor_booleano__isnull', False), _connector='OR'), name='regla_al_menos_un_valor', violation_error_message='Debe definir al menos un valor para la regla.'),
+        ),
+        migrations.AddConstraint(
+            model_name='reglasreprogramacion',
+            constraint=models.CheckConstraint(condition=models.Q(('fecha_inicio_vigencia__isnull', True), ('fecha_fin_vigencia__isnull', True), ('fecha_inicio_vigencia__lt', models.F('fecha_fin_vigencia')), _connector='OR'), name='regla_vigencia_ordenada', violation_error_message='La fecha de inicio debe ser anterior a la fecha de fin.'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:58
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Las operaciones CONCURRENTLY no pueden ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0011_reglas_check_constraints'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='reglasreprogramacion',
+            name='reservas_re_tipo_re_4a39cf_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='reserva',
+            name='reservas_re_estado_7c17e1_idx',
+        ),
+        # Mismo índice creado a mano en 0003; lo cubre (estado, fecha_inicio) de 0007
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS reservas_reserva_estado_idx;",
+            reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS reservas_reserva_estado_idx "
+                        "ON reservas_reserva(estado);"
+        ),
+    ]
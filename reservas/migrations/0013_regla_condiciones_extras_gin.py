@@ -0,0 +1,23 @@
+# Generated manually: índice GIN sobre condiciones_extras para consultas de
+# contención (condiciones_extras__contains / @>). jsonb_path_ops solo soporta
+# @>, pero el índice es más pequeño que el GIN por defecto.
+# CONCURRENTLY no puede ir dentro de una transacción, por eso atomic = False.
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0012_drop_redundant_estado_tipo_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS regla_condex_gin "
+            "ON reservas_reglasreprogramacion USING gin (condiciones_extras jsonb_path_ops);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS regla_condex_gin;"
+        ),
+    ]
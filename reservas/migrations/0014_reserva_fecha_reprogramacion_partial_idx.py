@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:59
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Las operaciones CONCURRENTLY no pueden ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('reservas', '0013_regla_condiciones_extras_gin'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('fecha_reprogramacion__isnull', False)), fields=['fecha_reprogramacion'], name='reserva_freprog_partial'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='reserva',
+            name='reservas_re_fecha_r_89d651_idx',
+        ),
+        # Mismo índice completo creado a mano en 0003
+        migrations.RunSQL(
+            "DROP INDEX CONCURRENTLY IF EXISTS reservas_reserva_fecha_reprogramacion_idx;",
+            reverse_sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS reservas_reserva_fecha_reprogramacion_idx "
+                        "ON reservas_reserva(fecha_reprogramacion);"
+        ),
+    ]
@@ -1,4 +1,9 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.utils.functional import cached_property
 from core.models import TimeStampedModel
 from authz.models import Usuario
 from catalogo.models import Servicio
@@ -21,13 +26,27 @@ class Reserva(TimeStampedModel):
     reprogramado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, 
                                         related_name="reservas_reprogramadas", 
                                         help_text="Usuario que hizo la reprogramación")
+    recordatorio_enviado_para = models.DateTimeField(blank=True, null=True,
+                                                     help_text="Fecha de inicio para la que ya se envió el recordatorio")
     
     class Meta(TimeStampedModel.Meta):
         indexes = [
-            models.Index(fields=["usuario"]), 
-            models.Index(fields=["estado"]),
+            # usuario va primero: también cubre las búsquedas solo por usuario
+            models.Index(fields=["usuario", "estado", "-fecha_inicio"], name="reserva_usr_estado_fecha_idx"),
+            # Sin índice solo por estado: lo cubre (estado, fecha_inicio) de 0007
             models.Index(fields=["fecha_inicio"]),
-            models.Index(fields=["fecha_reprogramacion"])
+            # Solo las reservas reprogramadas tienen fecha_reprogramacion
+            models.Index(
+                fields=["fecha_reprogramacion"],
+                condition=models.Q(fecha_reprogramacion__isnull=False),
+                name="reserva_freprog_partial"
+            ),
+            # Índice parcial para enviar_recordatorios (solo reservas reprogramadas)
+            models.Index(
+                fields=["fecha_inicio", "numero_reprogramaciones"],
+                condition=models.Q(estado="REPROGRAMADA"),
+                name="reservas_recordatorio_idx"
+            ),
         ]
 
 class ReservaServicio(models.Model):
@@ -91,6 +110,47 @@ class HistorialReprogramacion(TimeStampedModel):
         verbose_name_plural = "Historiales de Reprogramación"
 
 
+# Caché de reglas/configuraciones (cambian poco y se consultan en cada
+# reprogramación). Cada grupo tiene un número de versión que forma parte de
+# la clave: invalidar es incrementar la versión, sin borrar claves una a una.
+# Con la caché local por proceso (sin REDIS_URL) la invalidación solo llega al
+# worker que guardó el cambio: el timeout acota cuánto tiempo ven datos viejos
+# los demás (ver CACHES en settings).
+REPROGRAMACION_CACHE_TIMEOUT = settings.RESERVAS_CACHE_TIMEOUT
+_SIN_CACHE = object()
+
+
+def _clave_cache(grupo, *partes):
+    version = cache.get_or_set(f'reservas:{grupo}:version', 1, None)
+    return ':'.join(['reservas', grupo, str(version), *map(str, partes)])
+
+
+def _invalidar_cache(grupo):
+    try:
+        cache.incr(f'reservas:{grupo}:version')
+    except ValueError:
+        cache.set(f'reservas:{grupo}:version', 1, None)
+
+
+# Valores compuestos de aplicable_a y los roles que cubren
+ROLES_COMPUESTOS = {
+    'CLIENTE_OPERADOR': ('CLIENTE', 'OPERADOR'),
+    'OPERADOR_ADMIN': ('OPERADOR', 'ADMIN'),
+}
+
+
+# Nombres de los días tal como se escriben en DIAS_BLACKOUT; el índice es weekday()
+NOMBRES_DIAS = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+_INDICE_DIAS = {nombre: indice for indice, nombre in enumerate(NOMBRES_DIAS)}
+
+
+def _aplicables_para_rol(rol):
+    """Valores de aplicable_a que aplican a `rol` (misma lógica que es_aplicable_a_rol)."""
+    return ['ALL', rol] + [
+        compuesto for compuesto, roles in ROLES_COMPUESTOS.items() if rol in roles
+    ]
+
+
 class ReglasReprogramacion(TimeStampedModel):
     """
     Modelo para configurar las reglas y políticas de reprogramación.
@@ -151,7 +211,7 @@ class ReglasReprogramacion(TimeStampedModel):
     mensaje_error = models.TextField(null=True, blank=True,
                                     help_text="Mensaje personalizado cuando se viola la regla")
     
-    # Condiciones adicionales
+    # Condiciones adicionales (índice GIN jsonb_path_ops en 0013 para __contains)
     condiciones_extras = models.JSONField(default=dict, blank=True,
                                          help_text="Condiciones adicionales en formato JSON")
     
@@ -160,13 +220,43 @@ class ReglasReprogramacion(TimeStampedModel):
         verbose_name = "Regla de Reprogramación"
         verbose_name_plural = "Reglas de Reprogramación"
         indexes = [
-            models.Index(fields=['tipo_regla', 'activa']),
+            # tipo_regla solo ya lo cubren unique_together y regla_tipo_prio_idx
             models.Index(fields=['aplicable_a', 'activa']),
             models.Index(fields=['prioridad']),
+            # Consulta de obtener_regla_activa: tipo + activa=True ordenado por prioridad
+            models.Index(
+                fields=['tipo_regla', 'prioridad'],
+                condition=models.Q(activa=True),
+                name='regla_tipo_prio_idx'
+            ),
         ]
         
         # Evitar reglas duplicadas del mismo tipo para el mismo rol
         unique_together = [['tipo_regla', 'aplicable_a']]
+        
+        # Invariantes de la regla validados por la BD en cada INSERT/UPDATE; el
+        # admin (ModelForm) también los comprueba y muestra estos mensajes
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(valor_numerico__isnull=False)
+                    | models.Q(valor_decimal__isnull=False)
+                    | (models.Q(valor_texto__isnull=False) & ~models.Q(valor_texto=''))
+                    | models.Q(valor_booleano__isnull=False)
+                ),
+                name='regla_al_menos_un_valor',
+                violation_error_message="Debe definir al menos un valor para la regla.",
+            ),
+            models.CheckConstraint(
+                condition=(
+                    models.Q(fecha_inicio_vigencia__isnull=True)
+                    | models.Q(fecha_fin_vigencia__isnull=True)
+                    | models.Q(fecha_inicio_vigencia__lt=models.F('fecha_fin_vigencia'))
+                ),
+                name='regla_vigencia_ordenada',
+                violation_error_message="La fecha de inicio debe ser anterior a la fecha de fin.",
+            ),
+        ]
     
     def __str__(self):
         # Django genera automáticamente get_tipo_regla_display() para campos con choices
@@ -184,8 +274,10 @@ class ReglasReprogramacion(TimeStampedModel):
             return True
         return False
     
-    def obtener_valor(self):
-        """Retorna el valor configurado según el tipo de dato."""
+    @cached_property
+    def _valor_parsed(self):
+        """Valor interpretado, calculado una vez por instancia (las reglas
+        cacheadas por obtener_regla_activa no vuelven a parsear el JSON)."""
         if self.valor_numerico is not None:
             return self.valor_numerico
         elif self.valor_decimal is not None:
@@ -195,48 +287,115 @@ class ReglasReprogramacion(TimeStampedModel):
         elif self.valor_texto:
             # Intentar parsear como JSON, si falla retornar como texto
             try:
-                import json
                 return json.loads(self.valor_texto)
-            except:
+            except ValueError:
                 return self.valor_texto
         return None
     
+    def obtener_valor(self):
+        """Retorna el valor configurado según el tipo de dato."""
+        return self._valor_parsed
+    
+    @cached_property
+    def dias_blackout(self):
+        """Para DIAS_BLACKOUT: frozenset de weekday() bloqueados, o None si el valor no es una lista."""
+        valor = self.obtener_valor()
+        if not isinstance(valor, list):
+            return None
+        indices = (_INDICE_DIAS.get(dia.lower()) for dia in valor if isinstance(dia, str))
+        return frozenset(indice for indice in indices if indice is not None)
+    
+    @cached_property
+    def horas_blackout(self):
+        """Para HORAS_BLACKOUT: frozenset de horas bloqueadas, o None si el valor no es una lista."""
+        valor = self.obtener_valor()
+        if not isinstance(valor, list):
+            return None
+        return frozenset(hora for hora in valor if isinstance(hora, (int, float)))
+    
+    def save(self, *args, **kwargs):
+        # Validación por campo (choices, max_length, etc.) también fuera de
+        # formularios y serializers; las invariantes entre campos las comprueba
+        # la BD (constraints) y unique_together el índice único
+        self.clean_fields()
+        # Los valores pueden haber cambiado: descartar lo ya interpretado
+        for atributo in ('_valor_parsed', 'dias_blackout', 'horas_blackout'):
+            self.__dict__.pop(atributo, None)
+        super().save(*args, **kwargs)
+    
     @classmethod
     def obtener_regla_activa(cls, tipo_regla, rol='ALL'):
-        """Obtiene la regla activa de mayor prioridad para un tipo y rol específico."""
-        reglas = cls.objects.filter(
+        """Obtiene la regla activa de mayor prioridad para un tipo y rol específico.
+        
+        El resultado (incluido "ninguna regla") queda en caché por (tipo, rol);
+        se invalida con invalidar_cache() al guardar/borrar reglas.
+        """
+        clave = _clave_cache('reglas', tipo_regla, rol)
+        regla = cache.get(clave, _SIN_CACHE)
+        if regla is not _SIN_CACHE:
+            return regla
+        
+        # El filtro por rol va en SQL: la BD devuelve solo la primera fila
+        regla = cls.objects.filter(
             tipo_regla=tipo_regla,
-            activa=True
-        ).order_by('prioridad')
+            activa=True,
+            aplicable_a__in=_aplicables_para_rol(rol)
+        ).order_by('prioridad').first()
         
-        for regla in reglas:
-            if regla.es_aplicable_a_rol(rol):
-                return regla
-        return None
+        cache.set(clave, regla, REPROGRAMACION_CACHE_TIMEOUT)
+        return regla
+    
+    @classmethod
+    def obtener_reglas_activas(cls, roles):
+        """Reglas activas que aplican a alguno de `roles` (o a ALL), indexadas
+        por (tipo_regla, aplicable_a).
+        
+        Una sola consulta para todos los tipos; queda en caché igual que
+        obtener_regla_activa y se invalida con invalidar_cache().
+        """
+        aplicables = sorted({aplicable for rol in [*roles, 'ALL'] for aplicable in _aplicables_para_rol(rol)})
+        clave = _clave_cache('reglas', 'activas', *aplicables)
+        reglas = cache.get(clave)
+        if reglas is None:
+            reglas = {
+                (regla.tipo_regla, regla.aplicable_a): regla
+                for regla in cls.objects.filter(activa=True, aplicable_a__in=aplicables)
+            }
+            cache.set(clave, reglas, REPROGRAMACION_CACHE_TIMEOUT)
+        return reglas
+    
+    @staticmethod
+    def elegir_regla(reglas, tipo_regla, rol='ALL'):
+        """Sobre el dict de obtener_reglas_activas, la regla que devolvería
+        obtener_regla_activa(tipo_regla, rol), sin ir a la BD."""
+        candidatas = [
+            reglas[(tipo_regla, aplicable)]
+            for aplicable in _aplicables_para_rol(rol)
+            if (tipo_regla, aplicable) in reglas
+        ]
+        return min(candidatas, key=lambda regla: regla.prioridad, default=None)
+    
+    @classmethod
+    def invalidar_cache(cls):
+        """Descarta las reglas cacheadas por obtener_regla_activa y obtener_reglas_activas."""
+        _invalidar_cache('reglas')
     
     @classmethod
     def obtener_valor_regla(cls, tipo_regla, rol='ALL', default=None):
         """Obtiene el valor de una regla específica."""
         regla = cls.obtener_regla_activa(tipo_regla, rol)
         return regla.obtener_valor() if regla else default
-    
-    def clean(self):
-        """Validación personalizada del modelo."""
-        from django.core.exceptions import ValidationError
-        
-        # Validar que al menos un valor esté definido
-        valores = [self.valor_numerico, self.valor_decimal, self.valor_texto, self.valor_booleano]
-        if all(v is None or v == '' for v in valores):
-            raise ValidationError("Debe definir al menos un valor para la regla.")
-        
-        # Validar fechas de vigencia
-        if (self.fecha_inicio_vigencia and self.fecha_fin_vigencia and 
-            self.fecha_inicio_vigencia >= self.fecha_fin_vigencia):
-            raise ValidationError("La fecha de inicio debe ser anterior a la fecha de fin.")
-    
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+
+
+# Conversión de ConfiguracionGlobalReprogramacion.valor según tipo_valor
+_PARSERS = {
+    'STRING': lambda valor: valor,
+    'INTEGER': int,
+    'DECIMAL': float,
+    'BOOLEAN': lambda valor: valor.lower() in ('true', '1', 'yes', 'si'),
+    'JSON': json.loads,
+    'LISTA': lambda valor: [item.strip() for item in valor.split(',')],
+}
 
 
 class ConfiguracionGlobalReprogramacion(TimeStampedModel):
@@ -268,26 +427,36 @@ class ConfiguracionGlobalReprogramacion(TimeStampedModel):
     def __str__(self):
         return f"{self.clave}: {self.valor[:50]}"
     
+    @cached_property
+    def _valor_tipado(self):
+        """Valor convertido una vez por instancia (las configuraciones cacheadas
+        por obtener_configuracion no vuelven a convertirlo en cada lectura)."""
+        # Tipos desconocidos se devuelven como texto, igual que STRING
+        return _PARSERS.get(self.tipo_valor, _PARSERS['STRING'])(self.valor)
+    
     def obtener_valor_tipado(self):
         """Convierte el valor al tipo correcto."""
-        if self.tipo_valor == 'INTEGER':
-            return int(self.valor)
-        elif self.tipo_valor == 'DECIMAL':
-            return float(self.valor)
-        elif self.tipo_valor == 'BOOLEAN':
-            return self.valor.lower() in ['true', '1', 'yes', 'si']
-        elif self.tipo_valor == 'JSON':
-            import json
-            return json.loads(self.valor)
-        elif self.tipo_valor == 'LISTA':
-            return [item.strip() for item in self.valor.split(',')]
-        return self.valor
+        return self._valor_tipado
+    
+    def save(self, *args, **kwargs):
+        # valor/tipo_valor pueden haber cambiado: descartar el valor ya convertido
+        self.__dict__.pop('_valor_tipado', None)
+        super().save(*args, **kwargs)
     
     @classmethod
     def obtener_configuracion(cls, clave, default=None):
-        """Obtiene una configuración específica."""
-        try:
-            config = cls.objects.get(clave=clave, activa=True)
-            return config.obtener_valor_tipado()
-        except cls.DoesNotExist:
+        """Obtiene una configuración específica (cacheada por clave)."""
+        clave_cache = _clave_cache('configuracion', clave)
+        config = cache.get(clave_cache, _SIN_CACHE)
+        if config is _SIN_CACHE:
+            config = cls.objects.filter(clave=clave, activa=True).first()
+            cache.set(clave_cache, config, REPROGRAMACION_CACHE_TIMEOUT)
+        
+        if config is None:
             return default
+        return config.obtener_valor_tipado()
+    
+    @classmethod
+    def invalidar_cache(cls):
+        """Descarta las configuraciones cacheadas por obtener_configuracion."""
+        _invalidar_cache('configuracion')
@@ -1,19 +1,59 @@
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
 from django.utils.html import strip_tags
 from django.utils import timezone
+from django.db.models import Prefetch, prefetch_related_objects
+from datetime import timedelta
+from .models import ReservaServicio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Se resuelve una sola vez al importar: cada envío solo hace render(). Si no
+# existe, se avisa aquí una vez y los emails usan el texto plano de respaldo
+try:
+    _CLIENTE_TPL = get_template('emails/reprogramacion_cliente.html')
+except TemplateDoesNotExist:
+    _CLIENTE_TPL = None
+    logger.warning("Template emails/reprogramacion_cliente.html no encontrado; se enviarán emails en texto plano")
+
+# Columnas de Reserva/usuario que usan las notificaciones; quien cargue una
+# reserva solo para notificar puede pasarlas a .only() (con select_related('usuario'))
+CAMPOS_RESERVA_NOTIFICACION = (
+    'id', 'usuario', 'fecha_inicio', 'estado', 'total', 'moneda', 'numero_reprogramaciones',
+    'usuario__nombres', 'usuario__apellidos', 'usuario__email', 'usuario__telefono',
+)
+
+
+def _detalles_con_servicio(reserva):
+    """Detalles de la reserva con su servicio ya cargado.
+    
+    Se consultan una sola vez por instancia (queda en `detalles_con_servicio`),
+    así notificar_cliente y notificar_administrador comparten la misma consulta
+    y el acceso a `detalle.servicio` no dispara un SELECT por fila.
+    """
+    prefetch_related_objects([reserva], Prefetch(
+        'detalles',
+        queryset=ReservaServicio.objects.select_related('servicio').only(
+            'reserva', 'cantidad', 'precio_unitario', 'servicio__titulo'
+        ),
+        to_attr='detalles_con_servicio'
+    ))
+    return reserva.detalles_con_servicio
+
 
 class NotificacionReprogramacion:
     """Maneja las notificaciones por email para reprogramaciones"""
     
     @staticmethod
-    def notificar_cliente(reserva, fecha_anterior, motivo=None):
-        """Envía notificación al cliente sobre la reprogramación"""
+    def notificar_cliente(reserva, fecha_anterior, motivo=None, connection=None):
+        """Envía notificación al cliente sobre la reprogramación
+        
+        Si se pasa `connection` (conexión SMTP ya abierta) se reutiliza en
+        lugar de abrir una nueva para este email.
+        """
         try:
             usuario = reserva.usuario
             
@@ -24,17 +64,17 @@ class NotificacionReprogramacion:
                 'fecha_anterior': fecha_anterior,
                 'fecha_nueva': reserva.fecha_inicio,
                 'motivo': motivo,
-                'servicios': reserva.detalles.all(),
+                'servicios': _detalles_con_servicio(reserva),
             }
             
             # Crear el email
             asunto = f"Tu reserva #{reserva.pk} ha sido reprogramada"
             
             # Template en HTML (si existe)
-            try:
-                mensaje_html = render_to_string('emails/reprogramacion_cliente.html', contexto)
+            if _CLIENTE_TPL is not None:
+                mensaje_html = _CLIENTE_TPL.render(contexto)
                 mensaje_texto = strip_tags(mensaje_html)
-            except:
+            else:
                 # Fallback a mensaje simple si no hay template
                 mensaje_texto = f"""
 Hola {usuario.nombres} {usuario.apellidos},
@@ -62,7 +102,8 @@ Equipo de Turismo
                     subject=asunto,
                     body=mensaje_texto,
                     from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[usuario.email]
+                    to=[usuario.email],
+                    connection=connection
                 )
                 email.attach_alternative(mensaje_html, "text/html")
                 email.send()
@@ -72,7 +113,8 @@ Equipo de Turismo
                     message=mensaje_texto,
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[usuario.email],
-                    fail_silently=False
+                    fail_silently=False,
+                    connection=connection
                 )
             
             logger.info(f"Notificación de reprogramación enviada al cliente {usuario.email} para reserva {reserva.pk}")
@@ -97,6 +139,12 @@ Equipo de Turismo
             # Crear solicitud de soporte en lugar de enviar email
             asunto = f"Reprogramación de reserva #{reserva.pk}"
             
+            # Fuera del f-string: antes de Python 3.12 no admite "\n" en sus expresiones
+            servicios = "\n".join(
+                f"- {detalle.servicio.titulo} (x{detalle.cantidad})"
+                for detalle in _detalles_con_servicio(reserva)
+            )
+            
             descripcion = f"""Nueva reprogramación registrada:
 
 Reserva ID: #{reserva.pk}
@@ -114,7 +162,7 @@ Detalles de la reprogramación:
 {f'Motivo: {motivo}' if motivo else 'Sin motivo especificado'}
 
 Servicios incluidos:
-{chr(10).join([f"- {detalle.servicio.titulo} (x{detalle.cantidad})" for detalle in reserva.detalles.all()])}
+{servicios}
 
 Por favor, revisa y confirma la disponibilidad de recursos para la nueva fecha.
             """
@@ -147,12 +195,19 @@ Por favor, revisa y confirma la disponibilidad de recursos para la nueva fecha.
             return False
     
     @staticmethod
-    def enviar_recordatorio_reprogramacion(reserva, dias_antes=1):
-        """Envía recordatorio de la nueva fecha programada"""
+    def enviar_recordatorio_reprogramacion(reserva, dias_antes=1, connection=None, hoy=None):
+        """Envía recordatorio de la nueva fecha programada
+        
+        Si se pasa `connection` (conexión SMTP ya abierta) se reutiliza en
+        lugar de abrir una nueva por cada email. `hoy` permite calcular la
+        fecha actual una sola vez cuando se envía un lote.
+        """
         try:
-            fecha_recordatorio = reserva.fecha_inicio - timezone.timedelta(days=dias_antes)
+            fecha_recordatorio = reserva.fecha_inicio - timedelta(days=dias_antes)
+            if hoy is None:
+                hoy = timezone.now().date()
             
-            if timezone.now().date() == fecha_recordatorio.date():
+            if hoy == fecha_recordatorio.date():
                 usuario = reserva.usuario
                 
                 asunto = f"Recordatorio: Tu reserva #{reserva.pk} es mañana"
@@ -170,17 +225,43 @@ Saludos,
 Equipo de Turismo
                 """
                 
-                send_mail(
+                # Con fail_silently los errores SMTP no se propagan: send_mail
+                # devuelve 0 y el recordatorio no cuenta como enviado
+                enviados = send_mail(
                     subject=asunto,
                     message=mensaje,
                     from_email=settings.DEFAULT_FROM_EMAIL,
                     recipient_list=[usuario.email],
-                    fail_silently=True
+                    fail_silently=True,
+                    connection=connection
                 )
+                if enviados != 1:
+                    logger.error(f"No se pudo enviar el recordatorio para reserva reprogramada {reserva.pk}")
+                    return False
                 
                 logger.info(f"Recordatorio enviado para reserva reprogramada {reserva.pk}")
                 return True
                 
         except Exception as e:
             logger.error(f"Error enviando recordatorio para reserva {reserva.pk}: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def enviar_recordatorios_lote(reservas, dias_antes=1):
+        """Envía los recordatorios de varias reservas con una sola conexión SMTP.
+        
+        Retorna una lista de tuplas (reserva, resultado, error) en el mismo
+        orden de `reservas`.
+        """
+        resultados = []
+        hoy = timezone.now().date()
+        with get_connection(fail_silently=True) as connection:
+            for reserva in reservas:
+                try:
+                    resultado = NotificacionReprogramacion.enviar_recordatorio_reprogramacion(
+                        reserva, dias_antes, connection=connection, hoy=hoy
+                    )
+                    resultados.append((reserva, resultado, None))
+                except Exception as e:
+                    resultados.append((reserva, False, e))
+        return resultados
@@ -1,14 +1,74 @@
 
 from rest_framework import serializers
 from .models import Reserva, ReservaServicio, Acompanante, ReservaAcompanante, HistorialReprogramacion, ReglasReprogramacion, ConfiguracionGlobalReprogramacion
+from .models import NOMBRES_DIAS, _aplicables_para_rol
 from authz.models import Usuario
 from catalogo.models import Servicio
 from decimal import Decimal
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import Field
 from typing import cast
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q, Sum
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_dob(valor):
+    """Convierte fecha_nacimiento (YYYY-MM-DD) a date; las fechas ya parseadas se devuelven tal cual."""
+    if not isinstance(valor, str):
+        return valor
+    try:
+        # fromisoformat es la ruta rápida en C; acepta el mismo formato que "%Y-%m-%d"
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ValidationError({
+            "acompanantes": f"Formato de fecha inválido para '{valor}'. Usa YYYY-MM-DD."
+        })
+
+def roles_del_request(request):
+    """Nombres de rol del usuario del request, consultados una sola vez por request.
+
+    Quedan en `request._cached_roles` (tupla, conserva el orden de la consulta);
+    vistas y serializers del mismo request reutilizan ese valor.
+    """
+    if request is None:
+        return ()
+    roles = getattr(request, '_cached_roles', None)
+    if roles is None:
+        roles = ()
+        user = getattr(request, 'user', None)
+        if isinstance(user, Usuario):
+            roles = tuple(user.roles.values_list('nombre', flat=True))
+        request._cached_roles = roles
+    return roles
+
+class RolesUsuarioMixin:
+    """Roles del usuario del request para validate/validate_<campo> (ver roles_del_request)."""
+
+    def _get_roles(self):
+        return list(roles_del_request(self.context.get('request')))
+
+class RepresentacionCacheMixin:
+    """Reutiliza la representación de un mismo objeto dentro de una respuesta.
+
+    En un listado el mismo usuario o acompañante aparece en muchas filas; la
+    representación se calcula una vez por pk y se guarda en el contexto (que
+    vive lo que dura la serialización). Solo para serializers de lectura cuyos
+    fields no cambian dinámicamente.
+    """
+
+    def to_representation(self, instance):
+        if instance.pk is None:
+            return super().to_representation(instance)
+        cache = self.context.setdefault('_repr_cache', {})
+        clave = (type(self), instance.pk)
+        if clave not in cache:
+            cache[clave] = super().to_representation(instance)
+        return cache[clave]
 
 class ReservaServicioSerializer(serializers.ModelSerializer):
     tipo = serializers.CharField(source="servicio.tipo", read_only=True)
@@ -18,17 +78,17 @@ class ReservaServicioSerializer(serializers.ModelSerializer):
         model = ReservaServicio
         fields = ["servicio", "tipo", "titulo", "cantidad", "precio_unitario", "fecha_servicio"]
 
-class UsuarioReservaSerializer(serializers.ModelSerializer):
+class UsuarioReservaSerializer(RepresentacionCacheMixin, serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = ["id", "nombres", "apellidos", "email", "telefono"]
 
-class AcompananteSerializer(serializers.ModelSerializer):
+class AcompananteSerializer(RepresentacionCacheMixin, serializers.ModelSerializer):
     class Meta:
         model = Acompanante
         fields = ["id", "nombre", "apellido", "documento", "fecha_nacimiento", "nacionalidad", "email", "telefono"]
 
-class ReservaAcompananteSerializer(serializers.ModelSerializer):
+class ReservaAcompananteSerializer(RolesUsuarioMixin, serializers.ModelSerializer):
     acompanante = AcompananteSerializer(read_only=True)
     acompanante_id = serializers.PrimaryKeyRelatedField(write_only=True, source='acompanante', queryset=Acompanante.objects.all(), required=False)
     reserva = serializers.PrimaryKeyRelatedField(queryset=Reserva.objects.all(), required=False)
@@ -44,21 +104,27 @@ class ReservaAcompananteSerializer(serializers.ModelSerializer):
         reserva = attrs.get('reserva')
         acompanante = attrs.get('acompanante')
 
-        # Evitar duplicados (misma reserva + mismo acompañante)
-        if reserva and isinstance(acompanante, Acompanante) and ReservaAcompanante.objects.filter(reserva=reserva, acompanante=acompanante).exists():
-            raise serializers.ValidationError({"acompanante": "Este acompañante ya está asociado a la reserva."})
+        es_acompanante = isinstance(acompanante, Acompanante)
+        if reserva and (es_acompanante or es_titular):
+            # Duplicado y titular existente en una sola consulta
+            conteos = {'titulares': Count('pk', filter=Q(es_titular=True))}
+            if es_acompanante:
+                conteos['duplicados'] = Count('pk', filter=Q(acompanante=acompanante))
+            conteos = ReservaAcompanante.objects.filter(reserva=reserva).aggregate(**conteos)
 
-        # Un solo titular por reserva
-        if es_titular and reserva and ReservaAcompanante.objects.filter(reserva=reserva, es_titular=True).exists():
-            raise serializers.ValidationError({"es_titular": "Ya existe un titular para esta reserva."})
+            # Evitar duplicados (misma reserva + mismo acompañante)
+            if conteos.get('duplicados'):
+                raise serializers.ValidationError({"acompanante": "Este acompañante ya está asociado a la reserva."})
+
+            # Un solo titular por reserva
+            if es_titular and conteos['titulares']:
+                raise serializers.ValidationError({"es_titular": "Ya existe un titular para esta reserva."})
 
         # Permisos: si el usuario es CLIENTE solo puede agregar a sus propias reservas
         request = self.context.get('request')
         if request is not None:
             user = request.user
-            roles = []
-            if hasattr(user, 'roles'):
-                roles = list(user.roles.values_list('nombre', flat=True))
+            roles = self._get_roles()
             if 'CLIENTE' in roles and reserva and reserva.usuario != user:
                 raise serializers.ValidationError({"detail": "No puedes agregar acompañantes a una reserva que no es tuya."})
 
@@ -76,14 +142,38 @@ class ReservaSerializer(serializers.ModelSerializer):
         ]
     read_only_fields = ["usuario"]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Carga por adelantado las relaciones anidadas que se serializan
+        (usuario, detalles con servicio, acompañantes), sin N+1 en listados."""
+        return queryset.select_related('usuario').prefetch_related(
+            Prefetch('detalles', queryset=ReservaServicio.objects.select_related('servicio')),
+            Prefetch('acompanantes', queryset=ReservaAcompanante.objects.select_related('acompanante')),
+        )
+
+    @staticmethod
+    def _resolver_servicios(detalles):
+        """Mapa pk -> Servicio de los detalles, con una sola consulta para los
+        que llegan como id (los que ya son instancias se reutilizan)."""
+        servicios = {}
+        ids = []
+        for d in detalles:
+            servicio_val = d.get('servicio')
+            if isinstance(servicio_val, Servicio):
+                servicios[servicio_val.pk] = servicio_val
+            else:
+                ids.append(servicio_val)
+        if ids:
+            servicios.update(Servicio.objects.in_bulk(ids))
+        return servicios
+
+    @transaction.atomic
     def create(self, validated_data):
         from .models import ReservaServicio, ReservaAcompanante, Acompanante as AcompananteModel
 
-        import sys
-        print('DEBUG validated_data:', validated_data, file=sys.stderr)
+        # Argumentos diferidos: el dict solo se formatea si DEBUG está habilitado
+        logger.debug('Creando reserva con validated_data: %s', validated_data)
         request = self.context.get('request')
-        if request is not None:
-            print('DEBUG request.data:', request.data, file=sys.stderr)
 
         detalles = validated_data.pop('detalles', [])
         # Prefer validated nested data; when nested serializer is read-only for 'acompanante'
@@ -94,42 +184,52 @@ class ReservaSerializer(serializers.ModelSerializer):
         if request is not None:
             acompanantes = request.data.get('acompanantes', [])
 
+        # Un solo titular por reserva: la reserva es nueva, así que basta con
+        # contar los del payload y fallar antes de cualquier INSERT
+        titulares_entrantes = sum(1 for rv in acompanantes if isinstance(rv, dict) and rv.get('es_titular'))
+        if titulares_entrantes > 1:
+            raise ValidationError({"acompanantes": "Solo puede haber un titular por reserva."})
+
         # Calcular precio real desde catalogo y total
         suma = Decimal('0')
         detalles_para_crear = []
+        # Personas ya reservadas por servicio; se calcula en una sola consulta
+        # la primera vez que un servicio tiene cupo que validar
+        personas_reservadas = None
+        servicios = self._resolver_servicios(detalles)
         validated_data.pop('acompanantes', None)
-        acompanantes = request.data.get('acompanantes', []) if request is not None else []  # Tomar acompañantes desde request.data
         for d in detalles:
             servicio_val = d.get('servicio')
             cantidad = int(d.get('cantidad', 1))
             fecha_servicio = d.get('fecha_servicio')
 
             # El campo nested puede venir ya convertido a instancia Servicio
-            if isinstance(servicio_val, Servicio):
-                servicio_obj = servicio_val
-            else:
-                try:
-                    servicio_obj = Servicio.objects.get(pk=servicio_val)
-                except Servicio.DoesNotExist:
-                    raise ValidationError({"detalles": f"Servicio con id {servicio_val} no encontrado."})
+            servicio_obj = servicios.get(servicio_val.pk if isinstance(servicio_val, Servicio) else servicio_val)
+            if servicio_obj is None:
+                raise ValidationError({"detalles": f"Servicio con id {servicio_val} no encontrado."})
 
             # VALIDACIÓN DE CUPO USANDO max_personas DEL PAQUETE
             paquete = getattr(servicio_obj, 'paquete', None)
             if paquete is not None:
                 max_personas = getattr(paquete, 'max_personas', None)
                 if max_personas is not None:
-                    # Contar personas ya reservadas para ese paquete
-                    from reservas.models import ReservaServicio
-                    reservas_servicio = ReservaServicio.objects.filter(servicio=servicio_obj)
-                    total_personas_reservadas = sum([rs.cantidad for rs in reservas_servicio])
+                    # Contar personas ya reservadas (SUM en la BD para todos los servicios del payload)
+                    if personas_reservadas is None:
+                        personas_reservadas = dict(
+                            ReservaServicio.objects.filter(servicio_id__in=servicios)
+                            .values('servicio_id').annotate(total=Sum('cantidad'))
+                            .values_list('servicio_id', 'total')
+                        )
+                    total_personas_reservadas = personas_reservadas.get(servicio_obj.pk) or 0
                     personas_nueva_reserva = cantidad
                     if total_personas_reservadas + personas_nueva_reserva > max_personas:
                         raise ValidationError({
                             'detalles': f"No hay cupo suficiente en el paquete '{paquete.nombre}'. Cupo máximo: {max_personas}, reservados: {total_personas_reservadas}"
                         })
 
+            # costo es DecimalField: Decimal * int es exacto, sin pasar por str()
             precio_real = servicio_obj.costo
-            subtotal = Decimal(str(precio_real)) * cantidad
+            subtotal = precio_real * cantidad
             suma += subtotal
             detalles_para_crear.append({
                 'servicio': servicio_obj,
@@ -144,68 +244,18 @@ class ReservaSerializer(serializers.ModelSerializer):
         # Crear la reserva
         reserva = Reserva.objects.create(**validated_data)
 
-        # Crear detalles con precio real
-        for detalle in detalles_para_crear:
-            ReservaServicio.objects.create(reserva=reserva, **detalle)
+        # Crear detalles con precio real (un solo INSERT)
+        ReservaServicio.objects.bulk_create(
+            [ReservaServicio(reserva=reserva, **detalle) for detalle in detalles_para_crear],
+            batch_size=500
+        )
 
         # Procesar acompañantes si vienen en el payload
         # El formato aceptado por acompanantes será una lista de objetos con la forma:
         # { "acompanante": {..datos..} | <id>, "estado": "CONFIRMADO", "es_titular": true }
-        titular_count = 0
-
-        for rv in acompanantes:
-            # rv puede ser un dict que contenga 'acompanante' o directamente los campos del acompanante
-            v = rv.get('acompanante') if isinstance(rv, dict) and 'acompanante' in rv else rv
-            estado = rv.get('estado') if isinstance(rv, dict) else None
-            es_titular = rv.get('es_titular', False) if isinstance(rv, dict) else False
-
-            acompanante_obj = None
-            # v puede ser instancia de Acompanante, un pk (int) o dict con datos
-            if isinstance(v, AcompananteModel):
-                acompanante_obj = v
-            elif isinstance(v, int):
-                acompanante_obj = AcompananteModel.objects.get(pk=v)
-            elif isinstance(v, dict):
-                # Validar campos requeridos antes de crear
-                documento = v.get('documento')
-                nombre = v.get('nombre')
-                apellido = v.get('apellido')
-                fecha_nacimiento = v.get('fecha_nacimiento')
-                # Normalizar fecha_nacimiento si viene como string
-                if isinstance(fecha_nacimiento, str):
-                    try:
-                         fecha_nacimiento = datetime.strptime(fecha_nacimiento, "%Y-%m-%d").date()
-                    except ValueError:
-                        raise ValidationError({
-                            "acompanantes": f"Formato de fecha inválido para '{fecha_nacimiento}'. Usa YYYY-MM-DD."
-                    })
-                # Si nos dan documento, intentar obtener; si no existe y faltan campos requeridos, lanzar error
-                if documento:
-                    acompanante_obj = AcompananteModel.objects.filter(documento=documento).first()
-                    if not acompanante_obj:
-                        # Para crear nuevo acompañante se requieren nombre, apellido y fecha_nacimiento
-                        missing = []
-                        if not nombre:
-                            missing.append('nombre')
-                        if not apellido:
-                            missing.append('apellido')
-                        if not fecha_nacimiento:
-                            missing.append('fecha_nacimiento')
-                        if missing:
-                            raise ValidationError({
-                                'acompanantes': f"Faltan campos para crear acompañante con documento '{documento}': {', '.join(missing)}"
-                            })
-                        acompanante_obj = AcompananteModel.objects.create(
-                            documento=documento,
-                            nombre=nombre,
-                            apellido=apellido,
-                            fecha_nacimiento=fecha_nacimiento,
-                            nacionalidad=v.get('nacionalidad'),
-                            email=v.get('email'),
-                            telefono=v.get('telefono'),
-                        )
-
         if acompanantes:
+            # Normalizar entradas a (datos, estado, es_titular)
+            entradas = []
             for rv in acompanantes:
                 # Permitir ambos formatos: plano y anidado
                 datos = None
@@ -223,61 +273,61 @@ class ReservaSerializer(serializers.ModelSerializer):
 
                 else:
                     datos = rv
+                entradas.append((datos, estado, es_titular))
+
+            # Validar todos los campos obligatorios antes de crear
+            documentos = []
+            for datos, _, _ in entradas:
+                if isinstance(datos, dict):
+                    missing = [campo for campo in ('documento', 'nombre', 'apellido', 'fecha_nacimiento') if not datos.get(campo)]
+                    if missing:
+                        raise ValidationError({
+                            'acompanantes': f"Faltan campos obligatorios para crear acompañante: {', '.join(missing)}"
+                        })
+                    documentos.append(datos['documento'])
+
+            # Resolver en lote: ids con un IN por pk y documentos existentes con un IN por documento
+            ids = [datos for datos, _, _ in entradas if isinstance(datos, int)]
+            por_id = AcompananteModel.objects.in_bulk(ids) if ids else {}
+            por_documento = AcompananteModel.objects.in_bulk(documentos, field_name='documento') if documentos else {}
 
+            nuevos = {}
+            asociaciones = []
+            for datos, estado, es_titular in entradas:
                 acompanante_obj = None
                 # datos puede ser instancia de Acompanante, un pk (int) o dict con datos
                 if isinstance(datos, AcompananteModel):
                     acompanante_obj = datos
                 elif isinstance(datos, int):
-                    acompanante_obj = AcompananteModel.objects.get(pk=datos)
+                    acompanante_obj = por_id.get(datos)
+                    if acompanante_obj is None:
+                        raise ValidationError({'acompanantes': f"Acompañante con id {datos} no encontrado."})
                 elif isinstance(datos, dict):
-                    # Si el dict tiene los campos de persona, usarlos siempre
-                    documento = datos.get('documento', '')
-                    nombre = datos.get('nombre', '')
-                    apellido = datos.get('apellido', '')
-                    fecha_nacimiento = datos.get('fecha_nacimiento', None)
-                    nacionalidad = datos.get('nacionalidad')
-                    email = datos.get('email')
-                    telefono = datos.get('telefono')
-
-                    # Validar todos los campos obligatorios antes de crear
-                    missing = []
-                    if not documento:
-                        missing.append('documento')
-                    if not nombre:
-                        missing.append('nombre')
-                    if not apellido:
-                        missing.append('apellido')
-                    if not fecha_nacimiento:
-                        missing.append('fecha_nacimiento')
-                    if missing:
-                        raise ValidationError({
-                            'acompanantes': f"Faltan campos obligatorios para crear acompañante: {', '.join(missing)}"
-                        })
-
-                    # Si nos dan documento, intentar obtener; si no existe, crear
-                    acompanante_obj = AcompananteModel.objects.filter(documento=documento).first()
-                    if not acompanante_obj:
-                        acompanante_obj = AcompananteModel.objects.create(
+                    # Si nos dan documento, usar el existente; si no existe, crearlo (una vez por documento)
+                    documento = datos['documento']
+                    acompanante_obj = por_documento.get(documento) or nuevos.get(documento)
+                    if acompanante_obj is None:
+                        acompanante_obj = nuevos[documento] = AcompananteModel(
                             documento=documento,
-                            nombre=nombre,
-                            apellido=apellido,
-                            fecha_nacimiento=fecha_nacimiento,
-                            nacionalidad=nacionalidad,
-                            email=email,
-                            telefono=telefono,
+                            nombre=datos['nombre'],
+                            apellido=datos['apellido'],
+                            fecha_nacimiento=_parse_dob(datos['fecha_nacimiento']),
+                            nacionalidad=datos.get('nacionalidad'),
+                            email=datos.get('email'),
+                            telefono=datos.get('telefono'),
                         )
+                else:
+                    # no se reconoce el formato, saltar
+                    continue
 
-                if es_titular:
-                    titular_count += 1
-
-                ReservaAcompanante.objects.create(reserva=reserva, acompanante=acompanante_obj, estado=estado or 'CONFIRMADO', es_titular=es_titular)
+                asociaciones.append(ReservaAcompanante(reserva=reserva, acompanante=acompanante_obj, estado=estado or 'CONFIRMADO', es_titular=es_titular))
 
-            if titular_count > 1:
-                raise ValidationError({"acompanantes": "Solo puede haber un titular por reserva."})
+            AcompananteModel.objects.bulk_create(nuevos.values(), batch_size=500)
+            ReservaAcompanante.objects.bulk_create(asociaciones, batch_size=500)
 
         return reserva
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         from .models import ReservaServicio, ReservaAcompanante, Acompanante as AcompananteModel
 
@@ -297,24 +347,29 @@ class ReservaSerializer(serializers.ModelSerializer):
 
         # Si vienen detalles, sincronizarlos: crear/actualizar/eliminar
         if detalles is not None:
-            # Mapear servicios existentes por id
-            existentes = {rs.servicio_id: rs for rs in instance.detalles.all()}
+            # Mapear servicios existentes por id (solo las columnas que se sincronizan)
+            existentes = {
+                rs.servicio_id: rs
+                for rs in instance.detalles.only('id', 'servicio', 'cantidad', 'precio_unitario', 'fecha_servicio')
+            }
             nuevos_servicios = set()
+            a_actualizar = []
+            a_crear = []
             suma = Decimal('0')
+            servicios = self._resolver_servicios(detalles)
             for d in detalles:
                 servicio_val = d.get('servicio')
                 cantidad = int(d.get('cantidad', 1))
                 fecha_servicio = d.get('fecha_servicio')
 
-                if isinstance(servicio_val, Servicio):
-                    servicio_obj = servicio_val
-                else:
-                    servicio_obj = Servicio.objects.get(pk=servicio_val)
+                servicio_obj = servicios.get(servicio_val.pk if isinstance(servicio_val, Servicio) else servicio_val)
+                if servicio_obj is None:
+                    raise ValidationError({"detalles": f"Servicio con id {servicio_val} no encontrado."})
                 # Ayuda a los analizadores estáticos
                 servicio_obj = cast(Servicio, servicio_obj)
 
                 precio_real = servicio_obj.costo
-                subtotal = Decimal(str(precio_real)) * cantidad
+                subtotal = precio_real * cantidad
                 suma += subtotal
 
                 servicio_id = getattr(servicio_obj, 'pk', None)
@@ -323,14 +378,16 @@ class ReservaSerializer(serializers.ModelSerializer):
                     rs.cantidad = cantidad
                     rs.precio_unitario = precio_real
                     rs.fecha_servicio = fecha_servicio
-                    rs.save()
+                    a_actualizar.append(rs)
                 else:
-                    ReservaServicio.objects.create(reserva=instance, servicio=servicio_obj, cantidad=cantidad, precio_unitario=precio_real, fecha_servicio=fecha_servicio)
+                    a_crear.append(ReservaServicio(reserva=instance, servicio=servicio_obj, cantidad=cantidad, precio_unitario=precio_real, fecha_servicio=fecha_servicio))
                 nuevos_servicios.add(servicio_id)
 
-            # Eliminar los que quedaron en existentes
-            for rem in existentes.values():
-                rem.delete()
+            # Eliminar los que quedaron en existentes (un DELETE), actualizar y crear en lote
+            if existentes:
+                ReservaServicio.objects.filter(pk__in=[rem.pk for rem in existentes.values()]).delete()
+            ReservaServicio.objects.bulk_update(a_actualizar, ['cantidad', 'precio_unitario', 'fecha_servicio'], batch_size=500)
+            ReservaServicio.objects.bulk_create(a_crear, batch_size=500)
 
             # Actualizar total con suma calculada
             instance.total = suma
@@ -338,92 +395,99 @@ class ReservaSerializer(serializers.ModelSerializer):
         # Procesar acompañantes: sincronizar asociaciones
         if acompanantes is not None:
             # Construir lista actual de acompanantes por id
-            actuales = {ra.acompanante_id: ra for ra in instance.acompanantes.all()}
+            actuales = {
+                ra.acompanante_id: ra
+                for ra in instance.acompanantes.only('id', 'acompanante', 'estado', 'es_titular')
+            }
             titular_count = 0
+            entradas = []
             for rv in acompanantes:
                 v = rv.get('acompanante') if isinstance(rv, dict) and 'acompanante' in rv else rv
                 estado = rv.get('estado') if isinstance(rv, dict) else None
                 es_titular = rv.get('es_titular', False) if isinstance(rv, dict) else False
+                if not isinstance(v, (AcompananteModel, int, dict)):
+                    # no se reconoce el formato, saltar
+                    continue
+                if es_titular:
+                    titular_count += 1
+                entradas.append((v, estado, es_titular))
 
-                acompanante_obj = None
+            # La sincronización elimina las asociaciones que no vienen en el payload,
+            # así que los titulares finales son exactamente los del payload: se valida
+            # antes de escribir nada
+            if titular_count > 1:
+                raise ValidationError({"acompanantes": "Solo puede haber un titular por reserva."})
+
+            # Resolver en lote: ids con un IN por pk y documentos existentes con un IN por documento
+            ids = [v for v, _, _ in entradas if isinstance(v, int)]
+            documentos = [v['documento'] for v, _, _ in entradas if isinstance(v, dict) and v.get('documento')]
+            por_id = AcompananteModel.objects.in_bulk(ids) if ids else {}
+            por_documento = AcompananteModel.objects.in_bulk(documentos, field_name='documento') if documentos else {}
+
+            resueltos = []
+            nuevos = []
+            nuevos_por_documento = {}
+            for v, estado, es_titular in entradas:
                 if isinstance(v, AcompananteModel):
                     acompanante_obj = v
                 elif isinstance(v, int):
-                    acompanante_obj = AcompananteModel.objects.get(pk=v)
-                elif isinstance(v, dict):
+                    acompanante_obj = por_id.get(v)
+                    if acompanante_obj is None:
+                        raise ValidationError({'acompanantes': f"Acompañante con id {v} no encontrado."})
+                else:
                     documento = v.get('documento')
-                    nombre = v.get('nombre')
-                    apellido = v.get('apellido')
-                    fecha_nacimiento = v.get('fecha_nacimiento')
-
-                    if documento:
-                        acompanante_obj = AcompananteModel.objects.filter(documento=documento).first()
-                        if not acompanante_obj:
-                            missing = []
-                            if not nombre:
-                                missing.append('nombre')
-                            if not apellido:
-                                missing.append('apellido')
-                            if not fecha_nacimiento:
-                                missing.append('fecha_nacimiento')
-                            if missing:
+                    acompanante_obj = (por_documento.get(documento) or nuevos_por_documento.get(documento)) if documento else None
+                    if acompanante_obj is None:
+                        missing = [campo for campo in ('nombre', 'apellido', 'fecha_nacimiento') if not v.get(campo)]
+                        if missing:
+                            if documento:
                                 raise ValidationError({
                                     'acompanantes': f"Faltan campos para crear acompañante con documento '{documento}': {', '.join(missing)}"
                                 })
-                            acompanante_obj = AcompananteModel.objects.create(
-                                documento=documento,
-                                nombre=nombre,
-                                apellido=apellido,
-                                fecha_nacimiento=fecha_nacimiento,
-                                nacionalidad=v.get('nacionalidad'),
-                                email=v.get('email'),
-                                telefono=v.get('telefono'),
-                            )
-                    else:
-                        missing = []
-                        if not nombre:
-                            missing.append('nombre')
-                        if not apellido:
-                            missing.append('apellido')
-                        if not fecha_nacimiento:
-                            missing.append('fecha_nacimiento')
-                        if missing:
                             raise ValidationError({'acompanantes': f"Faltan campos para crear acompañante: {', '.join(missing)}"})
-                        acompanante_obj = AcompananteModel.objects.create(
-                            documento=v.get('documento', ''),
-                            nombre=nombre,
-                            apellido=apellido,
-                            fecha_nacimiento=fecha_nacimiento,
+                        acompanante_obj = AcompananteModel(
+                            documento=documento or '',
+                            nombre=v.get('nombre'),
+                            apellido=v.get('apellido'),
+                            fecha_nacimiento=_parse_dob(v.get('fecha_nacimiento')),
                             nacionalidad=v.get('nacionalidad'),
                             email=v.get('email'),
                             telefono=v.get('telefono'),
                         )
-                else:
-                    # no se reconoce el formato, saltar
-                    continue
-
-                # Ayuda a los analizadores estáticos a inferir el tipo
-                acompanante_obj = cast(Acompanante, acompanante_obj)
-
-                if es_titular:
-                    titular_count += 1
-
-                acompanante_id = getattr(acompanante_obj, 'pk', None)
+                        nuevos.append(acompanante_obj)
+                        if documento:
+                            nuevos_por_documento[documento] = acompanante_obj
+                resueltos.append((acompanante_obj, estado, es_titular))
+
+            # Crear los acompañantes nuevos en un solo INSERT
+            AcompananteModel.objects.bulk_create(nuevos, batch_size=500)
+
+            asociaciones = []
+            a_actualizar = []
+            dejan_de_ser_titular = []
+            for acompanante_obj, estado, es_titular in resueltos:
+                acompanante_id = acompanante_obj.pk
                 if acompanante_id in actuales:
                     ra = actuales.pop(acompanante_id)
+                    if ra.es_titular and not es_titular:
+                        dejan_de_ser_titular.append(ra.pk)
                     ra.estado = estado or ra.estado
                     ra.es_titular = es_titular
-                    ra.save()
+                    a_actualizar.append(ra)
                 else:
-                    ReservaAcompanante.objects.create(reserva=instance, acompanante=acompanante_obj, estado=estado or 'CONFIRMADO', es_titular=es_titular)
-
-            # Eliminar asociaciones que no vinieron en el payload
-            for rem in actuales.values():
-                rem.delete()
-                
-
-            if titular_count > 1:
-                raise ValidationError({"acompanantes": "Solo puede haber un titular por reserva."})
+                    asociaciones.append(ReservaAcompanante(reserva=instance, acompanante=acompanante_obj, estado=estado or 'CONFIRMADO', es_titular=es_titular))
+
+            # Eliminar primero las asociaciones que no vinieron en el payload: si una
+            # de ellas era el titular, el nuevo titular no choca con uq_un_titular_por_reserva
+            if actuales:
+                ReservaAcompanante.objects.filter(pk__in=[rem.pk for rem in actuales.values()]).delete()
+            # El índice único parcial se comprueba fila a fila dentro del UPDATE en
+            # lote: quitar antes al titular anterior para que el cambio de titular
+            # entre dos filas existentes no dependa del orden de las filas
+            if dejan_de_ser_titular:
+                ReservaAcompanante.objects.filter(pk__in=dejan_de_ser_titular).update(es_titular=False)
+            ReservaAcompanante.objects.bulk_update(a_actualizar, ['estado', 'es_titular'], batch_size=500)
+            ReservaAcompanante.objects.bulk_create(asociaciones, batch_size=500)
 
         instance.save()
         return instance
@@ -443,7 +507,7 @@ class HistorialReprogramacionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'reprogramado_por', 'notificacion_enviada']
 
 
-class ReprogramacionReservaSerializer(serializers.Serializer):
+class ReprogramacionReservaSerializer(RolesUsuarioMixin, serializers.Serializer):
     """Serializador específico para solicitudes de reprogramación"""
     nueva_fecha = serializers.DateTimeField(
         help_text="Nueva fecha y hora para la reserva"
@@ -455,6 +519,29 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
         help_text="Motivo de la reprogramación (opcional)"
     )
     
+    def _regla_activa(self, tipo_regla, rol, roles):
+        """Equivale a ReglasReprogramacion.obtener_regla_activa(tipo_regla, rol),
+        pero sobre las reglas del usuario cargadas una sola vez por request
+        (quedan en el contexto y las reutilizan validate_nueva_fecha y validate)."""
+        reglas = self.context.get('_rules_cache')
+        if reglas is None:
+            reglas = self.context['_rules_cache'] = ReglasReprogramacion.obtener_reglas_activas(roles)
+        return ReglasReprogramacion.elegir_regla(reglas, tipo_regla, rol)
+    
+    def _primera_regla(self, tipo_regla, roles):
+        """Primera regla activa de tipo_regla según la precedencia roles del usuario → ALL."""
+        for rol in (*roles, 'ALL'):
+            regla = self._regla_activa(tipo_regla, rol, roles)
+            if regla:
+                return regla
+        return None
+    
+    def _servicios_reserva(self, reserva):
+        """Títulos de los servicios de la reserva, consultados como máximo una vez."""
+        if not hasattr(self, '_servicios_reserva_cache'):
+            self._servicios_reserva_cache = list(reserva.detalles.values_list('servicio__titulo', flat=True))
+        return self._servicios_reserva_cache
+    
     def validate_nueva_fecha(self, value):
         """Validaciones para la nueva fecha usando reglas dinámicas"""
         ahora = timezone.now()
@@ -463,21 +550,12 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
         if value <= ahora:
             raise ValidationError("No se puede reprogramar a una fecha pasada.")
         
-        # Obtener usuario y roles del contexto
-        request = self.context.get('request')
-        roles = []
-        if request and hasattr(request, 'user'):
-            user = request.user
-            if isinstance(user, Usuario) and hasattr(user, 'roles'):
-                roles = list(user.roles.values_list('nombre', flat=True))
+        # Obtener roles del usuario del contexto
+        roles = self._get_roles()
         
         # Aplicar reglas dinámicas de tiempo mínimo
-        tiempo_minimo = None
-        for rol in roles + ['ALL']:
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MINIMO', rol)
-            if regla:
-                tiempo_minimo = regla.obtener_valor()
-                break
+        regla = self._primera_regla('TIEMPO_MINIMO', roles)
+        tiempo_minimo = regla.obtener_valor() if regla else None
         
         # Si no hay regla específica, usar 24 horas por defecto
         if tiempo_minimo is None:
@@ -486,18 +564,14 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
         if isinstance(tiempo_minimo, (int, float)):
             tiempo_requerido = ahora + timedelta(hours=tiempo_minimo)
             if value <= tiempo_requerido:
-                regla_activa = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MINIMO', roles[0] if roles else 'ALL')
+                regla_activa = self._regla_activa('TIEMPO_MINIMO', roles[0] if roles else 'ALL', roles)
                 mensaje = (regla_activa.mensaje_error if regla_activa and regla_activa.mensaje_error 
                           else f"La reprogramación debe hacerse con al menos {tiempo_minimo} horas de anticipación.")
                 raise ValidationError(mensaje)
         
         # Aplicar reglas dinámicas de tiempo máximo
-        tiempo_maximo = None
-        for rol in roles + ['ALL']:
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MAXIMO', rol)
-            if regla:
-                tiempo_maximo = regla.obtener_valor()
-                break
+        regla = self._primera_regla('TIEMPO_MAXIMO', roles)
+        tiempo_maximo = regla.obtener_valor() if regla else None
         
         # Si no hay regla específica, usar 1 año por defecto
         if tiempo_maximo is None:
@@ -506,47 +580,35 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
         if isinstance(tiempo_maximo, (int, float)):
             tiempo_limite = ahora + timedelta(hours=tiempo_maximo)
             if value > tiempo_limite:
-                regla_activa = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MAXIMO', roles[0] if roles else 'ALL')
+                regla_activa = self._regla_activa('TIEMPO_MAXIMO', roles[0] if roles else 'ALL', roles)
                 mensaje = (regla_activa.mensaje_error if regla_activa and regla_activa.mensaje_error 
                           else f"No se puede reprogramar más de {tiempo_maximo/24:.0f} días en el futuro.")
                 raise ValidationError(mensaje)
         
         # Verificar días blackout
-        for rol in roles + ['ALL']:
-            regla = ReglasReprogramacion.obtener_regla_activa('DIAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    dias_blackout = regla.obtener_valor()
-                    if isinstance(dias_blackout, list):
-                        dia_semana = value.weekday()  # 0=lunes, 6=domingo
-                        nombres_dias = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
-                        if nombres_dias[dia_semana] in [d.lower() for d in dias_blackout]:
-                            mensaje = (regla.mensaje_error if regla.mensaje_error 
-                                     else f"No se puede reprogramar en {nombres_dias[dia_semana]}.")
-                            raise ValidationError(mensaje)
-                except:
-                    pass
+        regla = self._primera_regla('DIAS_BLACKOUT', roles)
+        if regla:
+            # dias_blackout: weekday() bloqueados, precalculados una vez por regla
+            # (valores no válidos se descartan ahí, no hace falta try/except)
+            dia_semana = value.weekday()  # 0=lunes, 6=domingo
+            if regla.dias_blackout and dia_semana in regla.dias_blackout:
+                mensaje = (regla.mensaje_error if regla.mensaje_error 
+                         else f"No se puede reprogramar en {NOMBRES_DIAS[dia_semana]}.")
+                raise ValidationError(mensaje)
         
         # Verificar horas blackout
-        for rol in roles + ['ALL']:
-            regla = ReglasReprogramacion.obtener_regla_activa('HORAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    horas_blackout = regla.obtener_valor()
-                    if isinstance(horas_blackout, list):
-                        hora_nueva = value.hour
-                        if hora_nueva in horas_blackout:
-                            mensaje = (regla.mensaje_error if regla.mensaje_error 
-                                     else f"No se puede reprogramar a las {hora_nueva}:00 horas.")
-                            raise ValidationError(mensaje)
-                except:
-                    pass
+        regla = self._primera_regla('HORAS_BLACKOUT', roles)
+        if regla:
+            hora_nueva = value.hour
+            if regla.horas_blackout and hora_nueva in regla.horas_blackout:
+                mensaje = (regla.mensaje_error if regla.mensaje_error 
+                         else f"No se puede reprogramar a las {hora_nueva}:00 horas.")
+                raise ValidationError(mensaje)
         
         return value
     
     def validate(self, attrs):
         """Validaciones adicionales considerando el contexto y reglas dinámicas"""
-        request = self.context.get('request')
         reserva = self.context.get('reserva')
         
         if reserva:
@@ -555,19 +617,11 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
                 raise ValidationError("No se puede reprogramar una reserva cancelada.")
             
             # Obtener roles del usuario
-            roles = []
-            if request and hasattr(request, 'user'):
-                user = request.user
-                if isinstance(user, Usuario) and hasattr(user, 'roles'):
-                    roles = list(user.roles.values_list('nombre', flat=True))
+            roles = self._get_roles()
             
             # Aplicar límite dinámico de reprogramaciones
-            limite_reprogramaciones = None
-            for rol in roles + ['ALL']:
-                regla = ReglasReprogramacion.obtener_regla_activa('LIMITE_REPROGRAMACIONES', rol)
-                if regla:
-                    limite_reprogramaciones = regla.obtener_valor()
-                    break
+            regla = self._primera_regla('LIMITE_REPROGRAMACIONES', roles)
+            limite_reprogramaciones = regla.obtener_valor() if regla else None
             
             # Si no hay regla específica, usar 3 por defecto
             if limite_reprogramaciones is None:
@@ -575,7 +629,7 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
             
             if isinstance(limite_reprogramaciones, (int, float)):
                 if reserva.numero_reprogramaciones >= int(limite_reprogramaciones):
-                    regla_activa = ReglasReprogramacion.obtener_regla_activa('LIMITE_REPROGRAMACIONES', roles[0] if roles else 'ALL')
+                    regla_activa = self._regla_activa('LIMITE_REPROGRAMACIONES', roles[0] if roles else 'ALL', roles)
                     mensaje = (regla_activa.mensaje_error if regla_activa and regla_activa.mensaje_error 
                               else f"Esta reserva ya ha sido reprogramada el máximo número de veces permitido ({limite_reprogramaciones}).")
                     raise ValidationError(mensaje)
@@ -587,20 +641,20 @@ class ReprogramacionReservaSerializer(serializers.Serializer):
                     raise ValidationError("La nueva fecha debe ser diferente a la fecha actual.")
             
             # Verificar servicios restringidos
-            for rol in roles + ['ALL']:
-                regla = ReglasReprogramacion.obtener_regla_activa('SERVICIOS_RESTRINGIDOS', rol)
-                if regla:
+            regla = self._primera_regla('SERVICIOS_RESTRINGIDOS', roles)
+            if regla:
+                servicios_restringidos = regla.obtener_valor()
+                if isinstance(servicios_restringidos, list):
                     try:
-                        servicios_restringidos = regla.obtener_valor()
-                        if isinstance(servicios_restringidos, list):
-                            servicios_reserva = list(reserva.detalles.values_list('servicio__titulo', flat=True))
-                            for servicio in servicios_reserva:
-                                if servicio in servicios_restringidos:
-                                    mensaje = (regla.mensaje_error if regla.mensaje_error 
-                                             else f"El servicio '{servicio}' tiene restricciones para reprogramar.")
-                                    raise ValidationError(mensaje)
-                    except:
-                        pass
+                        servicios_restringidos = set(servicios_restringidos)
+                    except TypeError:
+                        # Elementos no hashables (p. ej. objetos JSON): no son títulos
+                        servicios_restringidos = {s for s in servicios_restringidos if isinstance(s, str)}
+                    for servicio in self._servicios_reserva(reserva):
+                        if servicio in servicios_restringidos:
+                            mensaje = (regla.mensaje_error if regla.mensaje_error 
+                                     else f"El servicio '{servicio}' tiene restricciones para reprogramar.")
+                            raise ValidationError(mensaje)
         
         return attrs
 
@@ -621,6 +675,15 @@ class ReservaConHistorialSerializer(ReservaSerializer):
             'reprogramado_por', 'historial_reprogramaciones'
         ]
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return super().setup_eager_loading(queryset).prefetch_related(
+            Prefetch(
+                'historial_reprogramaciones',
+                queryset=HistorialReprogramacion.objects.select_related('reprogramado_por')
+            ),
+        )
+    
     def get_puede_reprogramar(self, obj):
         """Determina si la reserva puede ser reprogramada"""
         if obj.estado in ['CANCELADA']:
@@ -629,9 +692,13 @@ class ReservaConHistorialSerializer(ReservaSerializer):
         if obj.numero_reprogramaciones >= 3:
             return False
         
-        # Verificar que la fecha de inicio no sea muy próxima (menos de 24 horas)
-        ahora = timezone.now()
-        if obj.fecha_inicio <= ahora + timedelta(hours=24):
+        # Verificar que la fecha de inicio no sea muy próxima (menos de 24 horas).
+        # El corte puede venir en el contexto (context={'reprog_cutoff': ...}); si no,
+        # se calcula una vez por serialización y se reutiliza en cada fila
+        cutoff = self.context.get('reprog_cutoff')
+        if cutoff is None:
+            cutoff = self.context['reprog_cutoff'] = timezone.now() + timedelta(hours=24)
+        if obj.fecha_inicio <= cutoff:
             return False
         
         return True
@@ -669,25 +736,22 @@ class ReglasReprogramacionSerializer(serializers.ModelSerializer):
         if not request or not hasattr(request, 'user'):
             return True
         
-        user = request.user
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            roles = list(user.roles.values_list('nombre', flat=True))
-            for rol in roles:
-                if obj.es_aplicable_a_rol(rol):
-                    return True
-        return False
+        # Valores de aplicable_a que cubren alguno de los roles del usuario,
+        # calculados una vez por serialización (equivale a es_aplicable_a_rol)
+        aplicables = self.context.get('_aplicables_usuario')
+        if aplicables is None:
+            aplicables = self.context['_aplicables_usuario'] = frozenset(
+                aplicable for rol in roles_del_request(request) for aplicable in _aplicables_para_rol(rol)
+            )
+        return obj.aplicable_a in aplicables
     
     def validate(self, attrs):
         """Validación completa de reglas."""
-        # Validar que al menos un valor esté definido
-        valores = [
-            attrs.get('valor_numerico'),
-            attrs.get('valor_decimal'), 
-            attrs.get('valor_texto'),
-            attrs.get('valor_booleano')
-        ]
-        
-        if all(v is None or v == '' for v in valores):
+        # Validar que al menos un valor esté definido (vacío = None o '')
+        if (attrs.get('valor_numerico') in (None, '')
+                and attrs.get('valor_decimal') in (None, '')
+                and attrs.get('valor_texto') in (None, '')
+                and attrs.get('valor_booleano') in (None, '')):
             raise ValidationError("Debe definir al menos un valor para la regla.")
         
         # Validar fechas de vigencia
@@ -782,13 +846,18 @@ class ConfiguracionGlobalSerializer(serializers.ModelSerializer):
         return value
 
 
-class ValidadorReglasSerializer(serializers.Serializer):
+class ValidadorReglasSerializer(RolesUsuarioMixin, serializers.Serializer):
     """Serializador para validar si una reprogramación cumple con las reglas."""
     
     reserva_id = serializers.IntegerField()
     nueva_fecha = serializers.DateTimeField()
     motivo = serializers.CharField(required=False, allow_blank=True)
     
+    TIPOS_VALIDADOS = (
+        'TIEMPO_MINIMO', 'TIEMPO_MAXIMO', 'LIMITE_REPROGRAMACIONES',
+        'DIAS_BLACKOUT', 'HORAS_BLACKOUT',
+    )
+    
     def validate(self, attrs):
         """Aplica todas las reglas activas y retorna errores si las viola."""
         from .models import Reserva, ReglasReprogramacion
@@ -807,71 +876,58 @@ class ValidadorReglasSerializer(serializers.Serializer):
         if not request or not hasattr(request, 'user'):
             raise ValidationError('Usuario no autenticado.')
         
-        user = request.user
-        roles = []
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            roles = list(user.roles.values_list('nombre', flat=True))
+        roles = self._get_roles()
         
-        errores = []
+        # Todas las reglas activas de los roles en una consulta; por tipo se
+        # evalúa una vez cada regla distinta que gana para alguno de los roles
+        reglas = ReglasReprogramacion.obtener_reglas_activas(roles)
+        por_tipo = {}
+        for tipo_regla in self.TIPOS_VALIDADOS:
+            for rol in roles + ['ALL']:
+                regla = ReglasReprogramacion.elegir_regla(reglas, tipo_regla, rol)
+                if regla:
+                    por_tipo.setdefault(tipo_regla, {})[regla.pk] = regla
         
-        # Aplicar cada tipo de regla
-        for rol in roles + ['ALL']:
-            # Tiempo mínimo de anticipación
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MINIMO', rol)
-            if regla:
-                horas_minimas = regla.obtener_valor()
-                if horas_minimas is not None and isinstance(horas_minimas, (int, float)):
-                    tiempo_anticipacion = nueva_fecha - timezone.now()
-                    if tiempo_anticipacion.total_seconds() < (horas_minimas * 3600):
-                        errores.append(regla.mensaje_error or 
-                                     f"Debe reprogramar con al menos {horas_minimas} horas de anticipación.")
-            
-            # Tiempo máximo para reprogramar
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MAXIMO', rol)
-            if regla:
-                horas_maximas = regla.obtener_valor()
-                if horas_maximas is not None and isinstance(horas_maximas, (int, float)):
-                    tiempo_hasta_fecha = nueva_fecha - timezone.now()
-                    if tiempo_hasta_fecha.total_seconds() > (horas_maximas * 3600):
-                        errores.append(regla.mensaje_error or 
-                                     f"No puede reprogramar con más de {horas_maximas} horas de anticipación.")
-            
-            # Límite de reprogramaciones
-            regla = ReglasReprogramacion.obtener_regla_activa('LIMITE_REPROGRAMACIONES', rol)
-            if regla:
-                limite = regla.obtener_valor()
-                if limite is not None and isinstance(limite, (int, float)):
-                    if reserva.numero_reprogramaciones >= int(limite):
-                        errores.append(regla.mensaje_error or 
-                                     f"Ha alcanzado el límite de {limite} reprogramaciones para esta reserva.")
-            
-            # Días blackout
-            regla = ReglasReprogramacion.obtener_regla_activa('DIAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    import json
-                    dias_blackout = regla.obtener_valor()
-                    if isinstance(dias_blackout, list):
-                        dia_semana = nueva_fecha.weekday()  # 0=lunes, 6=domingo
-                        nombres_dias = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
-                        if nombres_dias[dia_semana] in [d.lower() for d in dias_blackout]:
-                            errores.append(regla.mensaje_error or 
-                                         f"No se puede reprogramar en {nombres_dias[dia_semana]}.")
-                except:
-                    pass
-            
-            # Horas blackout
-            regla = ReglasReprogramacion.obtener_regla_activa('HORAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    horas_blackout = regla.obtener_valor()
-                    if isinstance(horas_blackout, list):
-                        hora_nueva = nueva_fecha.hour
-                        if hora_nueva in horas_blackout:
-                            errores.append(regla.mensaje_error or 
-                                         f"No se puede reprogramar a las {hora_nueva}:00 horas.")
-                except:
-                    pass
+        errores = []
+        tiempo_hasta_fecha = (nueva_fecha - timezone.now()).total_seconds()
+        
+        # Tiempo mínimo de anticipación
+        for regla in por_tipo.get('TIEMPO_MINIMO', {}).values():
+            horas_minimas = regla.obtener_valor()
+            if horas_minimas is not None and isinstance(horas_minimas, (int, float)):
+                if tiempo_hasta_fecha < (horas_minimas * 3600):
+                    errores.append(regla.mensaje_error or 
+                                 f"Debe reprogramar con al menos {horas_minimas} horas de anticipación.")
+        
+        # Tiempo máximo para reprogramar
+        for regla in por_tipo.get('TIEMPO_MAXIMO', {}).values():
+            horas_maximas = regla.obtener_valor()
+            if horas_maximas is not None and isinstance(horas_maximas, (int, float)):
+                if tiempo_hasta_fecha > (horas_maximas * 3600):
+                    errores.append(regla.mensaje_error or 
+                                 f"No puede reprogramar con más de {horas_maximas} horas de anticipación.")
+        
+        # Límite de reprogramaciones
+        for regla in por_tipo.get('LIMITE_REPROGRAMACIONES', {}).values():
+            limite = regla.obtener_valor()
+            if limite is not None and isinstance(limite, (int, float)):
+                if reserva.numero_reprogramaciones >= int(limite):
+                    errores.append(regla.mensaje_error or 
+                                 f"Ha alcanzado el límite de {limite} reprogramaciones para esta reserva.")
+        
+        # Días blackout
+        dia_semana = nueva_fecha.weekday()  # 0=lunes, 6=domingo
+        for regla in por_tipo.get('DIAS_BLACKOUT', {}).values():
+            if regla.dias_blackout and dia_semana in regla.dias_blackout:
+                errores.append(regla.mensaje_error or 
+                             f"No se puede reprogramar en {NOMBRES_DIAS[dia_semana]}.")
+        
+        # Horas blackout
+        hora_nueva = nueva_fecha.hour
+        for regla in por_tipo.get('HORAS_BLACKOUT', {}).values():
+            if regla.horas_blackout and hora_nueva in regla.horas_blackout:
+                errores.append(regla.mensaje_error or 
+                             f"No se puede reprogramar a las {hora_nueva}:00 horas.")
         
         if errores:
             raise ValidationError({'reglas_violadas': errores})
@@ -887,18 +943,15 @@ class ResumenReglasSerializer(serializers.Serializer):
         from .models import ReglasReprogramacion
         
         request = self.context.get('request')
-        roles = ['ALL']
-        
-        if request and hasattr(request, 'user'):
-            user = request.user
-            if isinstance(user, Usuario) and hasattr(user, 'roles'):
-                roles.extend(list(user.roles.values_list('nombre', flat=True)))
+        roles = ['ALL', *roles_del_request(request)]
         
         resumen = {}
+        # Una consulta para todos los (tipo, rol); la selección se hace en memoria
+        reglas = ReglasReprogramacion.obtener_reglas_activas(roles)
         
         for tipo_regla, descripcion in ReglasReprogramacion.TIPOS_REGLA:
             for rol in roles:
-                regla = ReglasReprogramacion.obtener_regla_activa(tipo_regla, rol)
+                regla = ReglasReprogramacion.elegir_regla(reglas, tipo_regla, rol)
                 if regla and tipo_regla not in resumen:
                     resumen[tipo_regla] = {
                         'descripcion': descripcion,
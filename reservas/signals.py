@@ -0,0 +1,20 @@
+# reservas/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ReglasReprogramacion, ConfiguracionGlobalReprogramacion
+
+
+@receiver([post_save, post_delete], sender=ReglasReprogramacion)
+def invalidar_cache_reglas(sender, **kwargs):
+    """Cualquier alta/cambio/baja de una regla invalida la caché de reglas activas."""
+    # Al confirmar: así nadie vuelve a cachear los valores viejos mientras
+    # la transacción sigue abierta
+    transaction.on_commit(ReglasReprogramacion.invalidar_cache)
+
+
+@receiver([post_save, post_delete], sender=ConfiguracionGlobalReprogramacion)
+def invalidar_cache_configuracion(sender, **kwargs):
+    """Cualquier alta/cambio/baja de una configuración invalida su caché."""
+    transaction.on_commit(ConfiguracionGlobalReprogramacion.invalidar_cache)
@@ -0,0 +1,81 @@
+"""
+Tareas en segundo plano de reservas.
+
+El proyecto no cuenta con un broker de colas (Celery/RQ), así que el envío de
+emails se delega a un pool de hilos del propio proceso. Las tareas reciben ids
+(no instancias del ORM) y vuelven a leer los datos dentro del hilo.
+
+La cola vive en memoria: los emails pendientes se pierden si el proceso termina
+o se reinicia antes de enviarlos. En ese caso el historial queda con
+notificacion_enviada=False, que es lo que permite identificarlos.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Reserva, HistorialReprogramacion
+from .notifications import NotificacionReprogramacion, CAMPOS_RESERVA_NOTIFICACION
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reservas-notificaciones')
+
+# Intentos de envío del email al cliente y espera (segundos) antes del
+# segundo intento; se duplica en cada reintento
+NOTIFICACION_INTENTOS = 3
+NOTIFICACION_ESPERA_INICIAL = 2
+
+
+def enviar_notificacion_cliente(reserva_id, fecha_anterior, motivo=None, historial_id=None, soporte_ok=True):
+    """Envía el email de reprogramación al cliente y registra el resultado en el historial.
+    
+    Si el envío falla (p. ej. error SMTP) se reintenta hasta NOTIFICACION_INTENTOS
+    veces con espera exponencial.
+    """
+    try:
+        reserva = Reserva.objects.select_related('usuario').only(
+            *CAMPOS_RESERVA_NOTIFICACION
+        ).get(pk=reserva_id)
+        espera = NOTIFICACION_ESPERA_INICIAL
+        for intento in range(1, NOTIFICACION_INTENTOS + 1):
+            enviado = NotificacionReprogramacion.notificar_cliente(reserva, fecha_anterior, motivo)
+            if enviado or intento == NOTIFICACION_INTENTOS:
+                break
+            logger.warning(
+                'Reintentando notificación para reserva %s en %ss (intento %s de %s)',
+                reserva_id, espera, intento + 1, NOTIFICACION_INTENTOS
+            )
+            time.sleep(espera)
+            espera *= 2
+
+        if historial_id is not None:
+            HistorialReprogramacion.objects.filter(pk=historial_id).update(
+                notificacion_enviada=enviado and soporte_ok,
+                updated_at=timezone.now()
+            )
+        return enviado
+    except Exception:
+        logger.exception('Error en la tarea de notificación para reserva %s', reserva_id)
+        return False
+
+
+def _enviar_notificacion_cliente_en_hilo(*args):
+    """enviar_notificacion_cliente para el pool: el hilo no pasa por el ciclo
+    request/response, así que aquí se gestionan sus conexiones a la BD."""
+    close_old_connections()
+    try:
+        return enviar_notificacion_cliente(*args)
+    finally:
+        close_old_connections()
+
+
+def encolar_notificacion_cliente(reserva_id, fecha_anterior, motivo=None, historial_id=None, soporte_ok=True):
+    """Programa el email al cliente para después del commit, fuera del request."""
+    transaction.on_commit(
+        lambda: _executor.submit(
+            _enviar_notificacion_cliente_en_hilo, reserva_id, fecha_anterior, motivo, historial_id, soporte_ok
+        )
+    )
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from reservas import tasks
+from reservas.models import Reserva, ReservaServicio, HistorialReprogramacion
+from reservas.notifications import NotificacionReprogramacion, CAMPOS_RESERVA_NOTIFICACION
+from catalogo.models import Servicio, Categoria
+from authz.models import Usuario
+
+
+class NotificacionReprogramacionQueriesTests(TestCase):
+    def setUp(self):
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        cat = Categoria.objects.create(nombre='Cat')
+        self.reserva = Reserva.objects.create(usuario=self.user, fecha_inicio=timezone.now(), total=0, moneda='BOB')
+        # varios detalles: la cantidad de consultas no debe crecer con ellos
+        for i in range(3):
+            servicio = Servicio.objects.create(titulo=f'Serv {i}', tipo='GEN', categoria=cat, costo=100)
+            ReservaServicio.objects.create(reserva=self.reserva, servicio=servicio, cantidad=1, precio_unitario=servicio.costo)
+
+    def test_notificar_cliente_carga_detalles_en_una_consulta(self):
+        reserva = Reserva.objects.select_related('usuario').get(pk=self.reserva.pk)
+        # una sola consulta para detalles + servicio (sin N+1 en el template)
+        with self.assertNumQueries(1):
+            enviado = NotificacionReprogramacion.notificar_cliente(reserva, timezone.now(), 'motivo')
+        self.assertTrue(enviado)
+        self.assertEqual(len(mail.outbox), 1)
+        # una segunda llamada reutiliza los detalles ya cargados
+        with self.assertNumQueries(0):
+            NotificacionReprogramacion.notificar_cliente(reserva, timezone.now())
+
+    def test_notificar_cliente_con_campos_reducidos_no_carga_diferidos(self):
+        reserva = Reserva.objects.select_related('usuario').only(
+            *CAMPOS_RESERVA_NOTIFICACION
+        ).get(pk=self.reserva.pk)
+        # solo la consulta de detalles: ningún campo diferido se carga al renderizar
+        with self.assertNumQueries(1):
+            self.assertTrue(NotificacionReprogramacion.notificar_cliente(reserva, timezone.now(), 'motivo'))
+
+
+class BackendSMTPCaido(BaseEmailBackend):
+    """Como el backend SMTP con el servidor caído: con fail_silently devuelve 0."""
+
+    def send_messages(self, email_messages):
+        if self.fail_silently:
+            return 0
+        raise SMTPException('servidor no disponible')
+
+
+class EnviarRecordatoriosTests(TestCase):
+    def setUp(self):
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        self.reserva = Reserva.objects.create(
+            usuario=self.user, fecha_inicio=timezone.now() + timedelta(days=1), total=0, moneda='BOB',
+            estado='REPROGRAMADA', numero_reprogramaciones=1
+        )
+
+    def test_marca_recordatorio_enviado(self):
+        call_command('enviar_recordatorios', stdout=StringIO())
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.recordatorio_enviado_para, self.reserva.fecha_inicio)
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_BACKEND='reservas.tests.test_notifications.BackendSMTPCaido')
+    def test_fallo_smtp_no_marca_recordatorio(self):
+        call_command('enviar_recordatorios', stdout=StringIO())
+        self.reserva.refresh_from_db()
+        # no queda marcado: la próxima ejecución lo reintenta
+        self.assertIsNone(self.reserva.recordatorio_enviado_para)
+
+
+class BackendSMTPIntermitente(BaseEmailBackend):
+    """Falla en el primer envío y funciona en los siguientes."""
+    fallos_pendientes = 0
+
+    def send_messages(self, email_messages):
+        if BackendSMTPIntermitente.fallos_pendientes:
+            BackendSMTPIntermitente.fallos_pendientes -= 1
+            raise SMTPException('conexión cerrada por el servidor')
+        return len(email_messages)
+
+
+@override_settings(EMAIL_BACKEND='reservas.tests.test_notifications.BackendSMTPIntermitente')
+class EnviarNotificacionClienteTests(TestCase):
+    def setUp(self):
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        self.reserva = Reserva.objects.create(usuario=self.user, fecha_inicio=timezone.now(), total=0, moneda='BOB')
+        self.historial = HistorialReprogramacion.objects.create(
+            reserva=self.reserva, fecha_anterior=timezone.now(), fecha_nueva=timezone.now()
+        )
+
+    def test_reintenta_tras_error_smtp(self):
+        BackendSMTPIntermitente.fallos_pendientes = 1
+        with mock.patch('reservas.tasks.time.sleep') as sleep:
+            enviado = tasks.enviar_notificacion_cliente(self.reserva.pk, timezone.now(), 'clima', self.historial.pk)
+        self.assertTrue(enviado)
+        sleep.assert_called_once_with(tasks.NOTIFICACION_ESPERA_INICIAL)
+        self.historial.refresh_from_db()
+        self.assertTrue(self.historial.notificacion_enviada)
+
+    def test_agota_reintentos(self):
+        BackendSMTPIntermitente.fallos_pendientes = tasks.NOTIFICACION_INTENTOS
+        with mock.patch('reservas.tasks.time.sleep') as sleep:
+            enviado = tasks.enviar_notificacion_cliente(self.reserva.pk, timezone.now(), 'clima', self.historial.pk)
+        self.assertFalse(enviado)
+        self.assertEqual(sleep.call_count, tasks.NOTIFICACION_INTENTOS - 1)
+        self.historial.refresh_from_db()
+        self.assertFalse(self.historial.notificacion_enviada)
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from reservas.models import Reserva, ReservaServicio, ReglasReprogramacion, NOMBRES_DIAS
+from reservas.serializers import ReprogramacionReservaSerializer
+from catalogo.models import Servicio, Categoria
+from authz.models import Usuario
+
+
+class ReprogramacionReservaSerializerReglasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        self.reserva = Reserva.objects.create(
+            usuario=self.user, fecha_inicio=timezone.now() + timedelta(days=3), total=100, moneda='BOB'
+        )
+        self.nueva_fecha = timezone.localtime(timezone.now() + timedelta(days=10)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def _serializer(self):
+        return ReprogramacionReservaSerializer(
+            data={'nueva_fecha': self.nueva_fecha.isoformat()}, context={'reserva': self.reserva}
+        )
+
+    def test_sin_reglas_acepta_la_fecha(self):
+        self.assertTrue(self._serializer().is_valid())
+
+    def test_rechaza_dia_blackout(self):
+        ReglasReprogramacion.objects.create(
+            nombre='Sin reprogramar ese día', tipo_regla='DIAS_BLACKOUT', aplicable_a='ALL',
+            valor_texto=f'["{NOMBRES_DIAS[self.nueva_fecha.weekday()]}"]'
+        )
+        serializer = self._serializer()
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('nueva_fecha', serializer.errors)
+
+    def test_rechaza_hora_blackout(self):
+        ReglasReprogramacion.objects.create(
+            nombre='Sin reprogramar a esa hora', tipo_regla='HORAS_BLACKOUT', aplicable_a='ALL',
+            valor_texto=f'[{self.nueva_fecha.hour}]'
+        )
+        serializer = self._serializer()
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('nueva_fecha', serializer.errors)
+
+    def test_rechaza_servicio_restringido(self):
+        cat = Categoria.objects.create(nombre='Cat')
+        servicio = Servicio.objects.create(titulo='Tour Salar', tipo='GEN', categoria=cat, costo=100)
+        ReservaServicio.objects.create(reserva=self.reserva, servicio=servicio, cantidad=1, precio_unitario=100)
+        ReglasReprogramacion.objects.create(
+            nombre='Servicios sin reprogramación', tipo_regla='SERVICIOS_RESTRINGIDOS', aplicable_a='ALL',
+            valor_texto='["Tour Salar"]'
+        )
+        serializer = self._serializer()
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('non_field_errors', serializer.errors)
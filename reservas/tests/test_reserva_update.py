@@ -71,3 +71,114 @@ class ReservaUpdateTests(TestCase):
         if acomp_manager is not None:
             exists = acomp_manager.filter(acompanante__id=getattr(acomp, 'pk', None)).exists()
         self.assertTrue(exists)
+
+
+class ReservaSincronizacionTests(TestCase):
+    def setUp(self):
+        from authz.models import Rol
+        self.client = APIClient()
+        self.user = Usuario.objects.create(nombres='Admin', apellidos='User', email='admin@example.com')
+        self.user.roles.add(Rol.objects.get_or_create(nombre='ADMIN')[0])
+        self.client.force_authenticate(user=self.user)
+        cat = Categoria.objects.create(nombre='Cat')
+        self.s1 = Servicio.objects.create(titulo='Serv 1', tipo='GEN', categoria=cat, costo=100)
+        self.s2 = Servicio.objects.create(titulo='Serv 2', tipo='GEN', categoria=cat, costo=50)
+        self.s3 = Servicio.objects.create(titulo='Serv 3', tipo='GEN', categoria=cat, costo=10)
+        self.reserva = Reserva.objects.create(usuario=self.user, fecha_inicio=timezone.now(), total=0, moneda='BOB')
+        self.url = reverse('reserva-detail', args=[self.reserva.pk])
+        self.ana = Acompanante.objects.create(documento='A1', nombre='Ana', apellido='Lopez', fecha_nacimiento='1990-01-01')
+        self.beto = Acompanante.objects.create(documento='B1', nombre='Beto', apellido='Rios', fecha_nacimiento='1991-01-01')
+
+    def test_patch_detalles_actualiza_crea_y_elimina(self):
+        existente = ReservaServicio.objects.create(reserva=self.reserva, servicio=self.s1, cantidad=1, precio_unitario=100)
+        ReservaServicio.objects.create(reserva=self.reserva, servicio=self.s3, cantidad=1, precio_unitario=10)
+        payload = {'detalles': [{'servicio': self.s1.pk, 'cantidad': 3}, {'servicio': self.s2.pk, 'cantidad': 2}]}
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        detalles = {d.servicio_id: d for d in self.reserva.detalles.all()}
+        self.assertEqual(set(detalles), {self.s1.pk, self.s2.pk})
+        # el detalle existente se actualiza en su misma fila
+        self.assertEqual(detalles[self.s1.pk].pk, existente.pk)
+        self.assertEqual(detalles[self.s1.pk].cantidad, 3)
+        self.assertEqual(detalles[self.s2.pk].precio_unitario, 50)
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.total, 400)
+
+    def test_update_resuelve_acompanantes_por_id_y_documento(self):
+        from reservas.serializers import ReservaSerializer
+        acompanantes = [
+            self.ana.pk,
+            {'documento': 'B1'},
+            {'documento': 'C1', 'nombre': 'Caro', 'apellido': 'Paz', 'fecha_nacimiento': '1992-03-04'},
+        ]
+        ReservaSerializer().update(self.reserva, {'acompanantes': acompanantes})
+
+        documentos = set(self.reserva.acompanantes.values_list('acompanante__documento', flat=True))
+        self.assertEqual(documentos, {'A1', 'B1', 'C1'})
+        # solo se crea el acompañante cuyo documento no existía
+        self.assertEqual(Acompanante.objects.count(), 3)
+
+    def test_patch_cambia_titular_entre_asociaciones_existentes(self):
+        from reservas.models import ReservaAcompanante
+        # la fila del nuevo titular va primero: el UPDATE en lote la procesa antes
+        ReservaAcompanante.objects.create(reserva=self.reserva, acompanante=self.beto, es_titular=False)
+        ReservaAcompanante.objects.create(reserva=self.reserva, acompanante=self.ana, es_titular=True)
+        payload = {'acompanantes': [
+            {'acompanante_id': self.beto.pk, 'es_titular': True},
+            {'acompanante_id': self.ana.pk, 'es_titular': False},
+        ]}
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        titulares = list(self.reserva.acompanantes.filter(es_titular=True).values_list('acompanante_id', flat=True))
+        self.assertEqual(titulares, [self.beto.pk])
+
+    def test_patch_rechaza_dos_titulares(self):
+        from reservas.models import ReservaAcompanante
+        ReservaAcompanante.objects.create(reserva=self.reserva, acompanante=self.ana, es_titular=True)
+        payload = {'acompanantes': [
+            {'acompanante_id': self.ana.pk, 'es_titular': True},
+            {'acompanante_id': self.beto.pk, 'es_titular': True},
+        ]}
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('acompanantes', response.data)
+        # no se escribió nada
+        self.assertEqual(list(self.reserva.acompanantes.values_list('acompanante_id', flat=True)), [self.ana.pk])
+
+    def test_post_resuelve_acompanantes_por_documento_y_rechaza_dos_titulares(self):
+        from authz.models import Rol
+        cliente = Usuario.objects.create(nombres='Cli', apellidos='Ente', email='cliente@example.com')
+        cliente.roles.add(Rol.objects.get_or_create(nombre='CLIENTE')[0])
+        self.client.force_authenticate(user=cliente)
+        url = reverse('reserva-list')
+        base = {'fecha_inicio': timezone.now().isoformat(), 'moneda': 'BOB',
+                'detalles': [{'servicio': self.s1.pk, 'cantidad': 2}]}
+
+        # A1 y B1 ya existen (se reutilizan por documento); D1 se crea
+        payload = dict(base, acompanantes=[
+            {'documento': 'A1', 'nombre': 'Ana', 'apellido': 'Lopez', 'fecha_nacimiento': '1990-01-01'},
+            {'documento': 'B1', 'nombre': 'Beto', 'apellido': 'Rios', 'fecha_nacimiento': '1991-01-01',
+             'es_titular': True},
+            {'acompanante': {'documento': 'D1', 'nombre': 'Dani', 'apellido': 'Sol', 'fecha_nacimiento': '1993-05-06'}},
+        ])
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        reserva = Reserva.objects.get(pk=response.data['id'])
+        self.assertEqual(reserva.total, 200)
+        self.assertEqual(
+            set(reserva.acompanantes.values_list('acompanante__documento', flat=True)), {'A1', 'B1', 'D1'}
+        )
+        self.assertEqual(Acompanante.objects.count(), 3)
+        self.assertEqual(
+            list(reserva.acompanantes.filter(es_titular=True).values_list('acompanante_id', flat=True)), [self.beto.pk]
+        )
+
+        payload = dict(base, acompanantes=[
+            {'documento': 'A1', 'nombre': 'Ana', 'apellido': 'Lopez', 'fecha_nacimiento': '1990-01-01', 'es_titular': True},
+            {'documento': 'B1', 'nombre': 'Beto', 'apellido': 'Rios', 'fecha_nacimiento': '1991-01-01', 'es_titular': True},
+        ])
+        antes = Reserva.objects.count()
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Reserva.objects.count(), antes)
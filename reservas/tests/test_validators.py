@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from reservas.models import Reserva, ReservaServicio, ReglasReprogramacion
+from reservas.validators import ValidadorReprogramacionDinamico, GeneradorRecomendaciones
+from catalogo.models import Servicio, Categoria
+from authz.models import Usuario
+
+
+class ValidadorReglasCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        self.reserva = Reserva.objects.create(
+            usuario=self.user, fecha_inicio=timezone.now() + timedelta(days=3), total=100, moneda='BOB'
+        )
+        ReglasReprogramacion.objects.create(
+            nombre='Anticipación', tipo_regla='TIEMPO_MINIMO', aplicable_a='ALL', valor_numerico=48
+        )
+        ReglasReprogramacion.objects.create(
+            nombre='Penalización', tipo_regla='DESCUENTO_PENALIZACION', aplicable_a='ALL', valor_numerico=10
+        )
+
+    def test_reglas_se_cargan_una_vez_por_validador(self):
+        validador = ValidadorReprogramacionDinamico(self.user)
+        # reglas + servicios de la reserva (sin servicios no hay consultas de conflictos),
+        # sin importar cuántos tipos de regla se evalúan
+        with self.assertNumQueries(2):
+            resultado = validador.validar_reprogramacion_completa(self.reserva, timezone.now() + timedelta(hours=24))
+        self.assertFalse(resultado['valida'])
+        self.assertEqual(resultado['penalizacion']['porcentaje'], 10)
+        self.assertEqual({r['tipo'] for r in resultado['reglas_aplicadas']}, {'TIEMPO_MINIMO', 'DESCUENTO_PENALIZACION'})
+
+        # una segunda validación reutiliza las reglas ya cargadas
+        reglas_aplicadas = resultado['reglas_aplicadas']
+        with self.assertNumQueries(1):
+            resultado = validador.validar_reprogramacion_completa(self.reserva, timezone.now() + timedelta(days=5))
+        self.assertTrue(resultado['valida'])
+        # el resumen de reglas tampoco se reconstruye
+        self.assertIs(resultado['reglas_aplicadas'], reglas_aplicadas)
+
+    def test_validacion_rapida_omite_disponibilidad_y_resumen(self):
+        # roles del usuario + reglas; sin consulta de servicios para disponibilidad
+        with self.assertNumQueries(2):
+            errores = ValidadorReprogramacionDinamico.obtener_errores_rapido(
+                self.reserva, timezone.now() + timedelta(hours=24), self.user
+            )
+        self.assertEqual(len(errores), 1)
+        self.assertTrue(
+            ValidadorReprogramacionDinamico.validar_rapido(self.reserva, timezone.now() + timedelta(days=5), self.user)
+        )
+
+    def test_fecha_pasada_no_evalua_reglas(self):
+        validador = ValidadorReprogramacionDinamico(roles=[])
+        with self.assertNumQueries(0):
+            resultado = validador.validar_reprogramacion_completa(self.reserva, timezone.now() - timedelta(days=1))
+        self.assertFalse(resultado['valida'])
+        self.assertEqual(resultado['errores'], ["No se puede reprogramar a una fecha pasada."])
+        self.assertEqual(resultado['reglas_aplicadas'], [])
+
+
+class SugerirFechasAlternativasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Usuario.objects.create(nombres='Ana', apellidos='Lopez', email='ana@example.com')
+        cat = Categoria.objects.create(nombre='Cat')
+        servicio = Servicio.objects.create(titulo='Tour', tipo='GEN', categoria=cat, costo=100)
+        self.fecha_deseada = timezone.now() + timedelta(days=30)
+        self.reserva = Reserva.objects.create(usuario=self.user, fecha_inicio=self.fecha_deseada, total=100, moneda='BOB')
+        ReservaServicio.objects.create(reserva=self.reserva, servicio=servicio, cantidad=1, precio_unitario=100)
+        # otra reserva con el mismo servicio el día anterior a la primera candidata
+        self.otra = Reserva.objects.create(
+            usuario=self.user, fecha_inicio=self.fecha_deseada - timedelta(days=7), total=100, moneda='BOB'
+        )
+        ReservaServicio.objects.create(reserva=self.otra, servicio=servicio, cantidad=1, precio_unitario=100)
+
+    def test_disponibilidad_de_candidatas_en_una_consulta(self):
+        # servicios de la reserva + conflictos de todas las fechas + reglas
+        with self.assertNumQueries(3):
+            sugerencias = GeneradorRecomendaciones.sugerir_fechas_alternativas(self.reserva, self.fecha_deseada)
+        self.assertEqual(len(sugerencias), 5)
+        primera = min(sugerencias, key=lambda s: s['fecha'])
+        self.assertFalse(primera['disponible'])
+        self.assertEqual(primera['conflictos'], 1)
+
+    def test_capacidad_de_candidatas_en_un_group_by(self):
+        ReglasReprogramacion.objects.create(
+            nombre='Capacidad', tipo_regla='CAPACIDAD_MAXIMA', aplicable_a='ALL', valor_numerico=1
+        )
+        # las anteriores + un solo conteo agrupado para todas las fechas
+        with self.assertNumQueries(4):
+            sugerencias = GeneradorRecomendaciones.sugerir_fechas_alternativas(self.reserva, self.fecha_deseada)
+        # el día de la otra reserva ya está lleno
+        dia_lleno = self.otra.fecha_inicio.date()
+        self.assertEqual(len(sugerencias), 5)
+        self.assertNotIn(dia_lleno, {s['fecha'].date() for s in sugerencias})
+
+    def test_verificar_disponibilidad_en_una_consulta_de_conflictos(self):
+        validador = ValidadorReprogramacionDinamico(roles=[])
+        fecha = self.fecha_deseada - timedelta(days=7)
+        # servicios de la reserva + filas en conflicto
+        with self.assertNumQueries(2):
+            disponibilidad = validador._verificar_disponibilidad(fecha, self.reserva)
+        self.assertEqual(disponibilidad, {'disponible': False, 'conflictos': 1, 'servicios_conflictivos': ['Tour']})
+
+
+class ReglasBlackoutTests(TestCase):
+    def test_dias_y_horas_blackout_precalculados(self):
+        dias = ReglasReprogramacion(tipo_regla='DIAS_BLACKOUT', valor_texto='["Sabado", "domingo", "feriado"]')
+        self.assertEqual(dias.dias_blackout, frozenset({5, 6}))
+        horas = ReglasReprogramacion(tipo_regla='HORAS_BLACKOUT', valor_texto='[0, 1, 23]')
+        self.assertEqual(horas.horas_blackout, frozenset({0, 1, 23}))
+        # un valor que no es lista no bloquea nada
+        self.assertIsNone(ReglasReprogramacion(tipo_regla='DIAS_BLACKOUT', valor_texto='lunes').dias_blackout)
@@ -0,0 +1,33 @@
+# reservas/urls.py
+
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+
+from .views import (
+    ReservaViewSet, AcompananteViewSet, ReservaAcompananteViewSet,
+    GestionReprogramacionAPIView, ReglasReprogramacionViewSet, ConfiguracionGlobalViewSet,
+    ValidadorReglasAPIView, ResumenReglasAPIView, GestionConfiguracionAPIView
+)
+
+# Los ViewSets se registran aquí; backend/urls.py fusiona este registro en el
+# router principal para conservar la raíz /api/ y los sufijos de formato.
+router = DefaultRouter()
+router.register(r"reservas", ReservaViewSet)
+router.register(r"acompanantes", AcompananteViewSet)
+router.register(r"reserva-acompanantes", ReservaAcompananteViewSet)
+
+# Endpoints para reglas de reprogramación
+router.register(r'reglas-reprogramacion', ReglasReprogramacionViewSet, basename='reglas-reprogramacion')
+router.register(r'configuracion-global', ConfiguracionGlobalViewSet, basename='configuracion-global')
+
+urlpatterns = [
+    # URLs específicas para reprogramaciones
+    path('reservas/<int:reserva_id>/reprogramar-avanzado/', 
+         GestionReprogramacionAPIView.as_view(), 
+         name='reprogramar-reserva-avanzado'),
+    
+    # URLs para validación y configuración de reglas
+    path('reglas/validar/', ValidadorReglasAPIView.as_view(), name='validar-reglas'),
+    path('reglas/resumen/', ResumenReglasAPIView.as_view(), name='resumen-reglas'),
+    path('configuracion/sistema/', GestionConfiguracionAPIView.as_view(), name='gestion-configuracion'),
+]
@@ -3,11 +3,13 @@ Validadores dinámicos para el sistema de reprogramaciones.
 Este módulo contiene la lógica central de validación que aplica todas las reglas configuradas.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models import Count
 from datetime import timedelta
 from authz.models import Usuario
+from .models import NOMBRES_DIAS
 
 
 class ValidadorReprogramacionDinamico:
@@ -16,11 +18,21 @@ class ValidadorReprogramacionDinamico:
     Este es el núcleo del sistema de validación flexible.
     """
     
-    def __init__(self, usuario: Optional[Usuario] = None):
+    def __init__(self, usuario: Optional[Usuario] = None, roles: Optional[Iterable[str]] = None):
         self.usuario = usuario
-        self.roles = self._obtener_roles_usuario()
+        # Quien ya tiene los roles del request (roles_del_request) los pasa y se evita la consulta
+        self.roles = [*roles, 'ALL'] if roles is not None else self._obtener_roles_usuario()
         self.errores: List[str] = []
         self.warnings: List[str] = []
+        # Reglas activas de los roles del usuario, por (tipo_regla, aplicable_a);
+        # se cargan en una sola consulta la primera vez que se necesitan
+        self._reglas_cache: Optional[Dict[tuple, Any]] = None
+        # Por tipo de regla: (rol, regla) del primer rol de self.roles que tiene una
+        self._mejores_reglas: Dict[str, tuple] = {}
+        # Resumen de reglas aplicadas: solo depende de roles y reglas, no de la fecha
+        self._reglas_aplicadas_cache: Optional[List[Dict[str, Any]]] = None
+        # Reservas por fecha precalculadas con precalcular_capacidad (id de reserva excluida, conteos)
+        self._reservas_por_fecha: Optional[tuple] = None
     
     def _obtener_roles_usuario(self) -> List[str]:
         """Obtiene los roles del usuario actual."""
@@ -33,15 +45,45 @@ class ValidadorReprogramacionDinamico:
         except AttributeError:
             return ['ALL']
     
-    def validar_reprogramacion_completa(self, reserva, nueva_fecha, motivo: str = "") -> Dict[str, Any]:
+    def _regla(self, tipo_regla: str, rol: str):
+        """Equivale a ReglasReprogramacion.obtener_regla_activa(tipo_regla, rol),
+        pero servida desde las reglas cargadas una vez por validador."""
+        from .models import ReglasReprogramacion
+        
+        if self._reglas_cache is None:
+            self._reglas_cache = ReglasReprogramacion.obtener_reglas_activas(self.roles)
+        return ReglasReprogramacion.elegir_regla(self._reglas_cache, tipo_regla, rol)
+    
+    def _mejor_regla_con_rol(self, tipo_regla: str) -> tuple:
+        """(rol, regla) que aplica para tipo_regla: el primer rol, en el orden de
+        self.roles, que tenga una regla activa; (None, None) si ninguno."""
+        if tipo_regla not in self._mejores_reglas:
+            self._mejores_reglas[tipo_regla] = (None, None)
+            for rol in self.roles:
+                regla = self._regla(tipo_regla, rol)
+                if regla:
+                    self._mejores_reglas[tipo_regla] = (rol, regla)
+                    break
+        return self._mejores_reglas[tipo_regla]
+    
+    def _mejor_regla(self, tipo_regla: str):
+        """Regla que aplica para tipo_regla (ver _mejor_regla_con_rol)."""
+        return self._mejor_regla_con_rol(tipo_regla)[1]
+    
+    def validar_reprogramacion_completa(self, reserva, nueva_fecha, motivo: str = "",
+                                        disponibilidad: Optional[Dict[str, Any]] = None,
+                                        full: bool = True) -> Dict[str, Any]:
         """
         Valida una reprogramación completa aplicando todas las reglas.
         
+        Si se pasa `disponibilidad` (calculada en lote con _disponibilidad_por_fecha)
+        no se vuelve a consultar. Con full=False solo se aplican las reglas y se
+        devuelven 'valida', 'errores' y 'warnings' (sin disponibilidad,
+        penalización ni resumen de reglas).
+        
         Returns:
             Dict con resultado de validación, errores, warnings y datos adicionales.
         """
-        from .models import ReglasReprogramacion
-        
         self.errores.clear()
         self.warnings.clear()
         
@@ -49,6 +91,26 @@ class ValidadorReprogramacionDinamico:
         self._validar_fecha_basica(nueva_fecha)
         self._validar_estado_reserva(reserva)
         
+        # Si ya falla lo básico no se evalúan reglas ni se consulta la BD
+        if self.errores:
+            resultado = {
+                'valida': False,
+                'errores': self.errores,
+                'warnings': self.warnings,
+            }
+            if full:
+                resultado.update({
+                    'disponibilidad': {},
+                    'penalizacion': {},
+                    'reglas_aplicadas': [],
+                    'metadatos': {
+                        'usuario_roles': self.roles,
+                        'fecha_validacion': timezone.now(),
+                        'numero_reglas_evaluadas': 0
+                    }
+                })
+            return resultado
+        
         # Aplicar reglas dinámicas
         self._aplicar_reglas_tiempo(nueva_fecha)
         self._aplicar_reglas_limites(reserva)
@@ -56,11 +118,20 @@ class ValidadorReprogramacionDinamico:
         self._aplicar_reglas_servicios(reserva)
         self._aplicar_reglas_capacidad(nueva_fecha, reserva)
         
+        if not full:
+            return {
+                'valida': len(self.errores) == 0,
+                'errores': self.errores,
+                'warnings': self.warnings,
+            }
+        
         # Verificar disponibilidad
-        disponibilidad = self._verificar_disponibilidad(nueva_fecha, reserva)
+        if disponibilidad is None:
+            disponibilidad = self._verificar_disponibilidad(nueva_fecha, reserva)
         
         # Calcular penalizaciones
         penalizacion = self._calcular_penalizacion(reserva)
+        reglas_aplicadas = self._obtener_reglas_aplicadas()
         
         return {
             'valida': len(self.errores) == 0,
@@ -68,11 +139,11 @@ class ValidadorReprogramacionDinamico:
             'warnings': self.warnings,
             'disponibilidad': disponibilidad,
             'penalizacion': penalizacion,
-            'reglas_aplicadas': self._obtener_reglas_aplicadas(),
+            'reglas_aplicadas': reglas_aplicadas,
             'metadatos': {
                 'usuario_roles': self.roles,
                 'fecha_validacion': timezone.now(),
-                'numero_reglas_evaluadas': len(self._obtener_reglas_aplicadas())
+                'numero_reglas_evaluadas': len(reglas_aplicadas)
             }
         }
     
@@ -94,175 +165,171 @@ class ValidadorReprogramacionDinamico:
     
     def _aplicar_reglas_tiempo(self, nueva_fecha):
         """Aplica reglas de tiempo mínimo y máximo."""
-        from .models import ReglasReprogramacion
-        
         ahora = timezone.now()
         
         # Tiempo mínimo
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MINIMO', rol)
-            if regla:
-                valor = regla.obtener_valor()
-                if isinstance(valor, (int, float)):
-                    tiempo_requerido = ahora + timedelta(hours=valor)
-                    if nueva_fecha <= tiempo_requerido:
-                        mensaje = regla.mensaje_error or f"Debe reprogramar con al menos {valor} horas de anticipación."
-                        self.errores.append(mensaje)
-                break
+        regla = self._mejor_regla('TIEMPO_MINIMO')
+        if regla:
+            valor = regla.obtener_valor()
+            if isinstance(valor, (int, float)):
+                tiempo_requerido = ahora + timedelta(hours=valor)
+                if nueva_fecha <= tiempo_requerido:
+                    mensaje = regla.mensaje_error or f"Debe reprogramar con al menos {valor} horas de anticipación."
+                    self.errores.append(mensaje)
         
         # Tiempo máximo
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('TIEMPO_MAXIMO', rol)
-            if regla:
-                valor = regla.obtener_valor()
-                if isinstance(valor, (int, float)):
-                    tiempo_limite = ahora + timedelta(hours=valor)
-                    if nueva_fecha > tiempo_limite:
-                        mensaje = regla.mensaje_error or f"No puede reprogramar más de {valor/24:.0f} días en el futuro."
-                        self.errores.append(mensaje)
-                break
+        regla = self._mejor_regla('TIEMPO_MAXIMO')
+        if regla:
+            valor = regla.obtener_valor()
+            if isinstance(valor, (int, float)):
+                tiempo_limite = ahora + timedelta(hours=valor)
+                if nueva_fecha > tiempo_limite:
+                    mensaje = regla.mensaje_error or f"No puede reprogramar más de {valor/24:.0f} días en el futuro."
+                    self.errores.append(mensaje)
     
     def _aplicar_reglas_limites(self, reserva):
         """Aplica reglas de límites de reprogramaciones."""
-        from .models import ReglasReprogramacion
-        
         # Límite por reserva
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('LIMITE_REPROGRAMACIONES', rol)
-            if regla:
-                limite = regla.obtener_valor()
-                if isinstance(limite, (int, float)) and reserva.numero_reprogramaciones >= int(limite):
-                    mensaje = regla.mensaje_error or f"Ha alcanzado el límite de {limite} reprogramaciones."
-                    self.errores.append(mensaje)
-                break
+        regla = self._mejor_regla('LIMITE_REPROGRAMACIONES')
+        if regla:
+            limite = regla.obtener_valor()
+            if isinstance(limite, (int, float)) and reserva.numero_reprogramaciones >= int(limite):
+                mensaje = regla.mensaje_error or f"Ha alcanzado el límite de {limite} reprogramaciones."
+                self.errores.append(mensaje)
         
         # Límite diario (por usuario)
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('LIMITE_DIARIO', rol)
-            if regla and self.usuario:
-                limite = regla.obtener_valor()
-                if isinstance(limite, (int, float)):
-                    hoy = timezone.now().date()
-                    from .models import HistorialReprogramacion
-                    reprogramaciones_hoy = HistorialReprogramacion.objects.filter(
-                        reprogramado_por=self.usuario,
-                        created_at__date=hoy
-                    ).count()
-                    
-                    if reprogramaciones_hoy >= int(limite):
-                        mensaje = regla.mensaje_error or f"Ha alcanzado el límite diario de {limite} reprogramaciones."
-                        self.errores.append(mensaje)
-                break
+        regla = self._mejor_regla('LIMITE_DIARIO')
+        if regla and self.usuario:
+            limite = regla.obtener_valor()
+            if isinstance(limite, (int, float)):
+                hoy = timezone.now().date()
+                from .models import HistorialReprogramacion
+                reprogramaciones_hoy = HistorialReprogramacion.objects.filter(
+                    reprogramado_por=self.usuario,
+                    created_at__date=hoy
+                ).count()
+                
+                if reprogramaciones_hoy >= int(limite):
+                    mensaje = regla.mensaje_error or f"Ha alcanzado el límite diario de {limite} reprogramaciones."
+                    self.errores.append(mensaje)
     
     def _aplicar_reglas_blackout(self, nueva_fecha):
         """Aplica reglas de días y horas blackout."""
-        from .models import ReglasReprogramacion
-        
         # Días blackout
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('DIAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    dias_blackout = regla.obtener_valor()
-                    if isinstance(dias_blackout, list):
-                        dia_semana = nueva_fecha.weekday()  # 0=lunes, 6=domingo
-                        nombres_dias = ['lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo']
-                        if nombres_dias[dia_semana] in [d.lower() for d in dias_blackout]:
-                            mensaje = regla.mensaje_error or f"No se puede reprogramar en {nombres_dias[dia_semana]}."
-                            self.errores.append(mensaje)
-                except (ValueError, TypeError):
-                    pass
-                break
+        regla = self._mejor_regla('DIAS_BLACKOUT')
+        if regla:
+            # dias_blackout: weekday() bloqueados, precalculados una vez por regla
+            dia_semana = nueva_fecha.weekday()  # 0=lunes, 6=domingo
+            if regla.dias_blackout and dia_semana in regla.dias_blackout:
+                mensaje = regla.mensaje_error or f"No se puede reprogramar en {NOMBRES_DIAS[dia_semana]}."
+                self.errores.append(mensaje)
         
         # Horas blackout
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('HORAS_BLACKOUT', rol)
-            if regla:
-                try:
-                    horas_blackout = regla.obtener_valor()
-                    if isinstance(horas_blackout, list):
-                        hora_nueva = nueva_fecha.hour
-                        if hora_nueva in horas_blackout:
-                            mensaje = regla.mensaje_error or f"No se puede reprogramar a las {hora_nueva}:00 horas."
-                            self.errores.append(mensaje)
-                except (ValueError, TypeError):
-                    pass
-                break
+        regla = self._mejor_regla('HORAS_BLACKOUT')
+        if regla:
+            hora_nueva = nueva_fecha.hour
+            if regla.horas_blackout and hora_nueva in regla.horas_blackout:
+                mensaje = regla.mensaje_error or f"No se puede reprogramar a las {hora_nueva}:00 horas."
+                self.errores.append(mensaje)
     
     def _aplicar_reglas_servicios(self, reserva):
         """Aplica reglas específicas de servicios."""
-        from .models import ReglasReprogramacion
-        
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('SERVICIOS_RESTRINGIDOS', rol)
-            if regla:
-                try:
-                    servicios_restringidos = regla.obtener_valor()
-                    if isinstance(servicios_restringidos, list):
-                        servicios_reserva = list(reserva.detalles.values_list('servicio__titulo', flat=True))
-                        for servicio in servicios_reserva:
-                            if servicio in servicios_restringidos:
-                                mensaje = regla.mensaje_error or f"El servicio '{servicio}' tiene restricciones para reprogramar."
-                                self.errores.append(mensaje)
-                except (ValueError, TypeError):
-                    pass
-                break
+        regla = self._mejor_regla('SERVICIOS_RESTRINGIDOS')
+        if regla:
+            try:
+                servicios_restringidos = regla.obtener_valor()
+                if isinstance(servicios_restringidos, list):
+                    servicios_reserva = list(reserva.detalles.values_list('servicio__titulo', flat=True))
+                    for servicio in servicios_reserva:
+                        if servicio in servicios_restringidos:
+                            mensaje = regla.mensaje_error or f"El servicio '{servicio}' tiene restricciones para reprogramar."
+                            self.errores.append(mensaje)
+            except (ValueError, TypeError):
+                pass
     
     def _aplicar_reglas_capacidad(self, nueva_fecha, reserva):
         """Aplica reglas de capacidad máxima."""
-        from .models import ReglasReprogramacion, Reserva
+        from .models import Reserva
         
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('CAPACIDAD_MAXIMA', rol)
-            if regla:
-                try:
-                    capacidad_maxima = regla.obtener_valor()
-                    if isinstance(capacidad_maxima, (int, float)):
-                        # Contar reservas en la nueva fecha
+        regla = self._mejor_regla('CAPACIDAD_MAXIMA')
+        if regla:
+            try:
+                capacidad_maxima = regla.obtener_valor()
+                if isinstance(capacidad_maxima, (int, float)):
+                    # Contar reservas en la nueva fecha (del lote precalculado si lo hay)
+                    fecha = nueva_fecha.date()
+                    reserva_id, conteos = self._reservas_por_fecha or (None, {})
+                    if reserva_id == reserva.id and fecha in conteos:
+                        reservas_fecha = conteos[fecha]
+                    else:
                         reservas_fecha = Reserva.objects.filter(
-                            fecha_inicio__date=nueva_fecha.date(),
+                            fecha_inicio__date=fecha,
                             estado__in=['PENDIENTE', 'PAGADA', 'REPROGRAMADA']
                         ).exclude(id=reserva.id).count()
                         
-                        if reservas_fecha >= int(capacidad_maxima):
-                            mensaje = regla.mensaje_error or f"La fecha alcanzó la capacidad máxima de {capacidad_maxima} reservas."
-                            self.errores.append(mensaje)
-                except (ValueError, TypeError):
-                    pass
-                break
+                    if reservas_fecha >= int(capacidad_maxima):
+                        mensaje = regla.mensaje_error or f"La fecha alcanzó la capacidad máxima de {capacidad_maxima} reservas."
+                        self.errores.append(mensaje)
+            except (ValueError, TypeError):
+                pass
+    
+    def precalcular_capacidad(self, fechas, reserva) -> None:
+        """Cuenta en un solo GROUP BY las reservas de varias fechas (date) para
+        que _aplicar_reglas_capacidad no haga un COUNT por fecha."""
+        from .models import Reserva
+        
+        conteos = dict.fromkeys(fechas, 0)
+        conteos.update(
+            Reserva.objects.filter(
+                fecha_inicio__date__in=list(conteos),
+                estado__in=['PENDIENTE', 'PAGADA', 'REPROGRAMADA']
+            ).exclude(id=reserva.id)
+            .values('fecha_inicio__date').annotate(n=Count('id'))
+            .values_list('fecha_inicio__date', 'n')
+        )
+        self._reservas_por_fecha = (reserva.id, conteos)
     
     def _verificar_disponibilidad(self, nueva_fecha, reserva) -> Dict[str, Any]:
         """Verifica disponibilidad detallada de servicios en la nueva fecha."""
+        # Misma consulta que el cálculo en lote: disponible, conflictos y
+        # servicios_conflictivos salen de una sola lista de filas
+        fecha = nueva_fecha.date()
+        return self._disponibilidad_por_fecha([fecha], reserva)[fecha]
+    
+    def _disponibilidad_por_fecha(self, fechas, reserva) -> Dict[Any, Dict[str, Any]]:
+        """Disponibilidad de servicios para varias fechas (date) en una sola consulta."""
         from .models import Reserva
         
         servicios_ids = list(reserva.detalles.values_list('servicio_id', flat=True))
+        disponibilidad = {
+            fecha: {'disponible': True, 'conflictos': 0, 'servicios_conflictivos': []}
+            for fecha in fechas
+        }
         
-        # Buscar conflictos
-        conflictos = Reserva.objects.filter(
-            fecha_inicio__date=nueva_fecha.date(),
+        # Una fila por detalle en conflicto: su cantidad es el número de conflictos
+        filas = Reserva.objects.filter(
+            fecha_inicio__date__in=list(disponibilidad),
             estado__in=['PENDIENTE', 'PAGADA', 'REPROGRAMADA'],
             detalles__servicio_id__in=servicios_ids
-        ).exclude(id=reserva.id)
+        ).exclude(id=reserva.id).values_list('fecha_inicio__date', 'detalles__servicio__titulo')
         
-        return {
-            'disponible': not conflictos.exists(),
-            'conflictos': conflictos.count(),
-            'servicios_conflictivos': list(conflictos.values_list('detalles__servicio__titulo', flat=True))
-        }
+        for fecha, titulo in filas:
+            datos = disponibilidad[fecha]
+            datos['disponible'] = False
+            datos['conflictos'] += 1
+            datos['servicios_conflictivos'].append(titulo)
+        
+        return disponibilidad
     
     def _calcular_penalizacion(self, reserva) -> Dict[str, Any]:
         """Calcula penalizaciones por reprogramar."""
-        from .models import ReglasReprogramacion
-        
         penalizacion_pct = 0
         
-        for rol in self.roles:
-            regla = ReglasReprogramacion.obtener_regla_activa('DESCUENTO_PENALIZACION', rol)
-            if regla:
-                valor = regla.obtener_valor()
-                if isinstance(valor, (int, float)):
-                    penalizacion_pct = valor
-                break
+        regla = self._mejor_regla('DESCUENTO_PENALIZACION')
+        if regla:
+            valor = regla.obtener_valor()
+            if isinstance(valor, (int, float)):
+                penalizacion_pct = valor
         
         penalizacion_monto = 0
         if penalizacion_pct > 0:
@@ -276,8 +343,13 @@ class ValidadorReprogramacionDinamico:
         }
     
     def _obtener_reglas_aplicadas(self) -> List[Dict[str, Any]]:
-        """Obtiene información de todas las reglas que se aplicaron."""
-        from .models import ReglasReprogramacion
+        """Obtiene información de todas las reglas que se aplicaron.
+        
+        Se calcula una vez por validador; las llamadas siguientes devuelven la
+        misma lista.
+        """
+        if self._reglas_aplicadas_cache is not None:
+            return self._reglas_aplicadas_cache
         
         reglas_aplicadas = []
         
@@ -288,32 +360,31 @@ class ValidadorReprogramacionDinamico:
         ]
         
         for tipo_regla in tipos_reglas:
-            for rol in self.roles:
-                regla = ReglasReprogramacion.obtener_regla_activa(tipo_regla, rol)
-                if regla:
-                    reglas_aplicadas.append({
-                        'tipo': tipo_regla,
-                        'rol': rol,
-                        'nombre': regla.nombre,
-                        'valor': regla.obtener_valor(),
-                        'prioridad': regla.prioridad
-                    })
-                    break
-        
+            rol, regla = self._mejor_regla_con_rol(tipo_regla)
+            if regla:
+                reglas_aplicadas.append({
+                    'tipo': tipo_regla,
+                    'rol': rol,
+                    'nombre': regla.nombre,
+                    'valor': regla.obtener_valor(),
+                    'prioridad': regla.prioridad
+                })
+        
+        self._reglas_aplicadas_cache = reglas_aplicadas
         return reglas_aplicadas
     
     @classmethod
     def validar_rapido(cls, reserva, nueva_fecha, usuario=None) -> bool:
         """Validación rápida que solo retorna True/False."""
         validador = cls(usuario)
-        resultado = validador.validar_reprogramacion_completa(reserva, nueva_fecha)
+        resultado = validador.validar_reprogramacion_completa(reserva, nueva_fecha, full=False)
         return resultado['valida']
     
     @classmethod
     def obtener_errores_rapido(cls, reserva, nueva_fecha, usuario=None) -> List[str]:
         """Obtiene solo la lista de errores."""
         validador = cls(usuario)
-        resultado = validador.validar_reprogramacion_completa(reserva, nueva_fecha)
+        resultado = validador.validar_reprogramacion_completa(reserva, nueva_fecha, full=False)
         return resultado['errores']
 
 
@@ -327,38 +398,44 @@ class GeneradorRecomendaciones:
         """
         from datetime import timedelta
         
+        # Un solo validador: sus reglas se cargan una vez para todas las candidatas
         validador = ValidadorReprogramacionDinamico(usuario)
         sugerencias = []
         
-        # Probar fechas cercanas a la deseada
-        for dias_offset in range(-7, 15):  # Una semana antes, dos semanas después
-            if dias_offset == 0:
-                continue  # Saltar la fecha deseada original
-            
-            fecha_candidata = fecha_deseada + timedelta(days=dias_offset)
+        # Probar fechas cercanas a la deseada: una semana antes, dos semanas después
+        # (saltando la fecha deseada original) y diferentes horas si es necesario
+        candidatas = [
+            fecha_deseada + timedelta(days=dias_offset, hours=hora_offset)
+            for dias_offset in range(-7, 15)
+            if dias_offset != 0
+            for hora_offset in (0, 1, -1, 2, -2)
+        ]
+        
+        # Conflictos (y, si hay regla de capacidad, reservas) de todas las fechas candidatas en lote
+        fechas = {fecha.date() for fecha in candidatas}
+        disponibilidad_por_fecha = validador._disponibilidad_por_fecha(fechas, reserva)
+        if validador._mejor_regla('CAPACIDAD_MAXIMA'):
+            validador.precalcular_capacidad(fechas, reserva)
+        
+        for fecha_con_hora in candidatas:
+            resultado = validador.validar_reprogramacion_completa(
+                reserva, fecha_con_hora,
+                disponibilidad=disponibilidad_por_fecha[fecha_con_hora.date()]
+            )
             
-            # Probar diferentes horas si es necesario
-            for hora_offset in [0, 1, -1, 2, -2]:
-                fecha_con_hora = fecha_candidata + timedelta(hours=hora_offset)
+            if resultado['valida']:
+                disponibilidad = resultado['disponibilidad']
                 
-                resultado = validador.validar_reprogramacion_completa(reserva, fecha_con_hora)
+                sugerencias.append({
+                    'fecha': fecha_con_hora,
+                    'disponible': disponibilidad['disponible'],
+                    'conflictos': disponibilidad['conflictos'],
+                    'penalizacion': resultado['penalizacion'],
+                    'score': GeneradorRecomendaciones._calcular_score(fecha_deseada, fecha_con_hora, resultado)
+                })
                 
-                if resultado['valida']:
-                    disponibilidad = resultado['disponibilidad']
-                    
-                    sugerencias.append({
-                        'fecha': fecha_con_hora,
-                        'disponible': disponibilidad['disponible'],
-                        'conflictos': disponibilidad['conflictos'],
-                        'penalizacion': resultado['penalizacion'],
-                        'score': GeneradorRecomendaciones._calcular_score(fecha_deseada, fecha_con_hora, resultado)
-                    })
-                    
-                    if len(sugerencias) >= cantidad:
-                        break
-            
-            if len(sugerencias) >= cantidad:
-                break
+                if len(sugerencias) >= cantidad:
+                    break
         
         # Ordenar por score (mejores primero)
         sugerencias.sort(key=lambda x: x['score'], reverse=True)
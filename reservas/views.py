@@ -7,16 +7,17 @@ from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.db import transaction
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from authz.models import Usuario
 import logging
 from typing import List, Any, Dict, cast
 
 from .models import Reserva, Acompanante, ReservaAcompanante, HistorialReprogramacion
 from .serializers import (
     ReservaSerializer, AcompananteSerializer, ReservaAcompananteSerializer,
-    ReprogramacionReservaSerializer, ReservaConHistorialSerializer, HistorialReprogramacionSerializer
+    ReprogramacionReservaSerializer, ReservaConHistorialSerializer, HistorialReprogramacionSerializer,
+    roles_del_request
 )
 from .notifications import NotificacionReprogramacion
+from .tasks import encolar_notificacion_cliente
 
 logger = logging.getLogger(__name__)
 
@@ -34,23 +35,17 @@ class ReservaViewSet(viewsets.ModelViewSet):
     # Puedes editar el campo estado a cualquiera de estos valores usando PATCH o PUT.
 
     def get_user_roles(self) -> List[str]:
-        user = self.request.user
-        # Verificar que el usuario sea una instancia de nuestro modelo Usuario personalizado
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            try:
-                return list(user.roles.values_list('nombre', flat=True))
-            except AttributeError:
-                pass
-        return []
+        # Una sola consulta por request, compartida con los serializers
+        return list(roles_del_request(self.request))
 
     def get_queryset(self) -> QuerySet:  # type: ignore[reportIncompatibleMethodOverride]
     # Nota: anotación de tipo para ayudar al analizador estático (Pylance).
         roles = self.get_user_roles()
         user = self.request.user
         if 'ADMIN' in roles or 'OPERADOR' in roles:
-            return Reserva.objects.all().select_related("usuario", "cupon").prefetch_related("detalles", "acompanantes__acompanante")
+            return self.get_serializer_class().setup_eager_loading(Reserva.objects.all())
         if 'CLIENTE' in roles:
-            return Reserva.objects.filter(usuario=user).select_related("usuario", "cupon").prefetch_related("detalles", "acompanantes__acompanante")
+            return self.get_serializer_class().setup_eager_loading(Reserva.objects.filter(usuario=user))
         return Reserva.objects.none()
 
     def perform_create(self, serializer):
@@ -153,17 +148,18 @@ class ReservaViewSet(viewsets.ModelViewSet):
                 reprogramado_por=request.user
             )
             
-            # Enviar notificaciones
-            notificacion_cliente = NotificacionReprogramacion.notificar_cliente(
-                reserva, fecha_anterior, motivo
-            )
+            # Enviar notificaciones: la de soporte es un registro en BD; el email
+            # al cliente se envía en segundo plano tras el commit, y la tarea
+            # marca historial.notificacion_enviada con el resultado
             notificacion_soporte = NotificacionReprogramacion.notificar_administrador(
                 reserva, fecha_anterior, request.user, motivo
             )
-            
-            # Marcar si las notificaciones fueron enviadas
-            historial.notificacion_enviada = notificacion_cliente and notificacion_soporte
-            historial.save()
+            encolar_notificacion_cliente(
+                reserva.pk, fecha_anterior, motivo, historial.pk, notificacion_soporte
+            )
+            # Aún no enviado, solo encolado: el resultado real se guarda en
+            # historial.notificacion_enviada
+            notificacion_cliente = False
         
         # Usar el serializador con historial para la respuesta
         response_serializer = ReservaConHistorialSerializer(reserva)
@@ -175,6 +171,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
             "reserva": response_serializer.data,
             "notificaciones_enviadas": {
                 "cliente": notificacion_cliente,
+                "cliente_encolado": True,
                 "soporte": notificacion_soporte
             }
         }, status=status.HTTP_200_OK)
@@ -277,18 +274,13 @@ class GestionReprogramacionAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_user_roles(self) -> List[str]:
-        user = self.request.user
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            try:
-                return list(user.roles.values_list('nombre', flat=True))
-            except AttributeError:
-                pass
-        return []
+        # Una sola consulta por request, compartida con los serializers
+        return list(roles_del_request(self.request))
     
     def post(self, request, reserva_id):
         """Reprogramar una reserva con validaciones completas"""
         # Obtener la reserva
-        reserva = get_object_or_404(Reserva, id=reserva_id)
+        reserva = get_object_or_404(Reserva.objects.select_related('usuario'), id=reserva_id)
         
         # Verificar permisos
         roles = self.get_user_roles()
@@ -350,16 +342,16 @@ class GestionReprogramacionAPIView(APIView):
                     reprogramado_por=request.user
                 )
                 
-                # Enviar notificaciones
-                notificacion_cliente = NotificacionReprogramacion.notificar_cliente(
-                    reserva, fecha_anterior, motivo
-                )
+                # Enviar notificaciones (email al cliente en segundo plano tras el commit)
                 notificacion_soporte = NotificacionReprogramacion.notificar_administrador(
                     reserva, fecha_anterior, request.user, motivo
                 )
-                
-                historial.notificacion_enviada = notificacion_cliente and notificacion_soporte
-                historial.save()
+                encolar_notificacion_cliente(
+                    reserva.pk, fecha_anterior, motivo, historial.pk, notificacion_soporte
+                )
+                # Aún no enviado, solo encolado: el resultado real se guarda en
+                # historial.notificacion_enviada
+                notificacion_cliente = False
                 
                 logger.info(f"Reprogramación exitosa - Reserva {reserva.pk} por usuario {request.user.pk}")
                 
@@ -370,6 +362,7 @@ class GestionReprogramacionAPIView(APIView):
                     "cambio_precio": cambio_precio,
                     "notificaciones": {
                         "cliente": notificacion_cliente,
+                        "cliente_encolado": True,
                         "soporte": notificacion_soporte
                     }
                 }, status=status.HTTP_200_OK)
@@ -482,13 +475,8 @@ class ReglasReprogramacionViewSet(viewsets.ModelViewSet):
     
     def get_user_roles(self) -> List[str]:
         """Obtiene los roles del usuario actual."""
-        user = self.request.user
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            try:
-                return list(user.roles.values_list('nombre', flat=True))
-            except AttributeError:
-                pass
-        return []
+        # Una sola consulta por request, compartida con los serializers
+        return list(roles_del_request(self.request))
     
     def check_admin_permission(self):
         """Verifica que el usuario sea administrador."""
@@ -611,13 +599,8 @@ class ConfiguracionGlobalViewSet(viewsets.ModelViewSet):
     
     def get_user_roles(self) -> List[str]:
         """Obtiene los roles del usuario actual."""
-        user = self.request.user
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            try:
-                return list(user.roles.values_list('nombre', flat=True))
-            except AttributeError:
-                pass
-        return []
+        # Una sola consulta por request, compartida con los serializers
+        return list(roles_del_request(self.request))
     
     def check_admin_permission(self):
         """Verifica que el usuario sea administrador."""
@@ -706,13 +689,8 @@ class GestionConfiguracionAPIView(APIView):
     
     def get_user_roles(self) -> List[str]:
         """Obtiene los roles del usuario actual."""
-        user = self.request.user
-        if isinstance(user, Usuario) and hasattr(user, 'roles'):
-            try:
-                return list(user.roles.values_list('nombre', flat=True))
-            except AttributeError:
-                pass
-        return []
+        # Una sola consulta por request, compartida con los serializers
+        return list(roles_del_request(self.request))
     
     def check_admin_permission(self):
         """Verifica que el usuario sea administrador."""